@@ -5,18 +5,28 @@ import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 from matplotlib.dates import DateFormatter
 from datetime import datetime
-from enum import Enum
 
 from config import load_config, CHART_TIME_FORMAT
+from src.alert_engine import AlertEngine, AlertEvent, AlertKind, Severity
+from src.chart_renderer import ChartRenderer
+from src.dashboard import EventHub, DashboardServer
 from src.data_reader import DataReader
 from src.logger import setup_logging
 from src.mikrotik_api import MikrotikAPI
+from src.flap_tracker import FlapTracker
+from src.peer_index import PeerRouteIndex, PeerChange
+from src.backup_loader import load_etalons
 from src.bgp_parser import BGPParser
-from src.storage import DataStorage, ChartStorage
-from src.utils import levenshtein_distance, clear_routes, clear_sessions, normalize
+from src.chunk_store import ChunkStore, ChunkedDataStorage
+from src.consistency import ConsistencyMonitor, Inconsistency
+from src.sketch import TableSketch, route_element
+from src.storage import DataStorage, CompressedDataStorage, ChartStorage
+from src.utils import levenshtein_distance, clear_routes, clear_sessions, normalize, route_diff, drop_distance_changes, format_prefix, route_prefix_key
 
 import asyncio
+import os
 import threading
+import time
 
 import tkinter as tk
 from tkinter import messagebox
@@ -34,30 +44,21 @@ line1, = ax.plot(xdata, [0], 'y.-', label='різниця із еталоном'
 line2, = ax.plot(xdata, [0], 'ro', label='диференційна різниці')
 
 date_formater = DateFormatter(CHART_TIME_FORMAT)
-# ax.xaxis.set_major_formatter(date_formater)
+ax.xaxis.set_major_formatter(date_formater)
 # ax.xaxis.set_major_locator(HourLocator(interval=1))
 # ax.xaxis.set_minor_locator(MinuteLocator(interval=1))
 # ax.xaxis.set_minor_locator(SecondLocator(interval=10))
 ax.set_title('Результати моніторингу маршрутної інформації')
-ax.set_xlabel('час, у періодах опитування')
+ax.set_xlabel('час')
 ax.set_ylabel('оцінка змін у одиницях відстані Левенштейна')
 ax.set_ylim(-0.05, 1.05)
 ax.legend()
-ax.set_xticklabels([])
 ax.grid(True)
+fig.autofmt_xdate()
 plt.draw()
 
-class Severity(Enum):
-    MINOR = 0
-    MAJOR = 1
-    INTRUSION = 2
-
-
-issue_counters: dict[Severity, int] = {
-    Severity.MINOR: 0,
-    Severity.MAJOR: 0,
-    Severity.INTRUSION: 0,
-}
+# Машина станів тривог усіх маршрутизаторів (створюється в run_monitoring); з неї ж береться статистика сеансу
+alert_engine: AlertEngine | None = None
 
 
 def show_message(severity: Severity, title: str, message: str) -> None:
@@ -71,19 +72,80 @@ def show_message(severity: Severity, title: str, message: str) -> None:
     except RuntimeError:
         pass
 
-async def bgp_observer(chart_file: str):
-    # Налаштування логування
-    setup_logging()
+
+event_hub = EventHub()
+
+
+def report_issue(router: str, severity: Severity, title: str, message: str, counts: dict[Severity, int]) -> None:
+    """Показ повідомлення про проблему та трансляція на панель моніторингу разом з лічильниками маршрутизатора."""
+    show_message(severity, title, message)
+    event_hub.publish_alert(router, severity.name, title, message)
+    event_hub.publish_counters(router, {key.name: value for key, value in counts.items()})
+
+ALERT_MESSAGES: dict[Severity, tuple[str, str]] = {
+    Severity.MINOR: ("Відмова", "Виникла відмова у з'єднаннях"),
+    Severity.MAJOR: ("Відмова", "Виникла значна відмова"),
+    Severity.INTRUSION: ("Втручання", "Підозра на втручання"),
+}
+
+def report_alert(event: AlertEvent, engine: AlertEngine) -> None:
+    """Показ події машини станів тривог оператору."""
+    title, message = ALERT_MESSAGES[event.severity]
+    if event.kind == AlertKind.CLEAR:
+        logging.info("Тривогу знято (%s): %s", event.router, message)
+        event_hub.publish_alert(event.router, event.severity.name, "Тривогу знято", message)
+        return
+    if event.kind == AlertKind.ESCALATE:
+        message = f"{message} (підвищення з рівня {event.previous.name})"
+    report_issue(event.router, event.severity, title, message, engine.router_counts(event.router))
+
+def report_peer_changes(router: str, changes: list[PeerChange]) -> None:
+    """Журналювання змін маршрутів з прив'язкою до сусідів BGP."""
+    for change in changes:
+        if change.withdrawn:
+            message = f"Втрачено всі маршрути від сусіда {change.peer} ({change.gateway}), кількість: {len(change.lost)}"
+            logging.critical(message)
+            event_hub.publish_alert(router, Severity.MAJOR.name, "Втрата сусіда", message)
+            continue
+        if change.lost:
+            logging.critical("Сусід %s (%s) відкликав маршрути: %s", change.peer, change.gateway, ", ".join(map(format_prefix, sorted(change.lost))))
+        if change.gained:
+            logging.critical("Сусід %s (%s) анонсував нові маршрути: %s", change.peer, change.gateway, ", ".join(map(format_prefix, sorted(change.gained))))
+
+def report_inconsistencies(new: list[Inconsistency], resolved: list[Inconsistency]) -> None:
+    """Журналювання розбіжностей між маршрутизаторами, знайдених кореляцією таблиць."""
+    for issue in new:
+        message = f"Префікс {issue.prefix} на {issue.router}: {issue.kind}, {issue.detail}"
+        logging.critical("Розбіжність між маршрутизаторами: %s", message)
+        event_hub.publish_alert(issue.router, Severity.MAJOR.name, "Розбіжність між маршрутизаторами", message)
+    for issue in resolved:
+        logging.info("Розбіжність усунено: префікс %s на %s (%s)", issue.prefix, issue.router, issue.kind)
+
+def router_configs() -> list[dict[str, Any]]:
+    """Маршрутизатори для спостереження: список routers або єдиний router з конфігурації."""
+    if config.get('routers'):
+        routers = [dict(router_config) for router_config in config['routers']]
+        for router_config in routers:
+            router_config.setdefault('etalon-router', router_config['name'])
+        return routers
+    router_config = dict(config['router'])
+    router_config.setdefault('name', router_config['host'])
+    router_config.setdefault('etalon-router', config['analyze']['etalon-router'])
+    return [router_config]
+
+async def bgp_observer(chart_file: str, router_config: dict[str, Any], alert_engine: AlertEngine,
+                       data_label: str = "overall", etalons: dict[str, dict] | None = None,
+                       consistency: ConsistencyMonitor | None = None):
     logging.info("Запуск програми для моніторингу BGP на MikroTik")
 
     # Завантаження конфігурації
     global config
-    router_config = config['router']
     storage_config = config['storage']
     running_config = config['running']
     analyze_config = config['analyze']
     minor_alert = float(analyze_config['minor-alert-level'])
     major_alert = float(analyze_config['major-alert-level'])
+    router_name = router_config['name']
 
     # Ініціалізація API
     mikrotik = MikrotikAPI(
@@ -94,43 +156,100 @@ async def bgp_observer(chart_file: str):
     )
 
     # Ініціалізація парсера BGP
-    parser = BGPParser(mikrotik)
+    parser = BGPParser(mikrotik, ipv6=router_config.get('ipv6', True))
 
     stop_event = threading.Event()
+    storage = None
     try:
+        chunk_store = ChunkStore(storage_config['chunk_path']) if storage_config.get('format') == 'chunked' else None
+        baseline_name = analyze_config.get('baseline', '')
+
         etalon_data: dict[str, Any] = {}
+        etalon_router = router_config['etalon-router']
+        if etalons and etalon_router not in etalons:
+            logging.error(f"Маршрутизатор {etalon_router} відсутній у {analyze_config['etalon']} "
+                          f"(наявні: {', '.join(sorted(etalons))}); для {router_name} використовується "
+                          f"збережений еталон або перше опитування")
+        if etalons and etalon_router in etalons:
+            # Еталон з резервних копій/експорту має перевагу й оновлює іменований еталон сховища
+            etalon_data = etalons[etalon_router]
+            logging.info(f"Еталон завантажено з {analyze_config['etalon']} для {etalon_router}")
+            if chunk_store and baseline_name:
+                chunk_store.save_baseline(router_name, baseline_name, etalon_data)
+        elif chunk_store and baseline_name:
+            # Іменований еталон, збережений у сховищі фрагментів під час попередніх запусків
+            etalon_data = chunk_store.load_baseline(router_name, baseline_name) or {}
+            if etalon_data:
+                logging.info(f"Еталон '{baseline_name}' завантажено зі сховища фрагментів "
+                             f"(знімок {etalon_data.get('timestamp', '')})")
         previous_data: dict[str, Any] = {}
+
+        # Ініціалізація збереження (один файл або набір сегментів на весь сеанс)
+        if chunk_store:
+            storage = ChunkedDataStorage(storage_config['output_path'], chunk_store, data_label)
+        elif storage_config.get('format') == 'gzip':
+            storage = CompressedDataStorage(
+                storage_config['output_path'],
+                max_bytes=int(storage_config.get('rotate-bytes', 64 * 1024 * 1024)),
+                max_seconds=float(storage_config.get('rotate-seconds', 3600)),
+                label=data_label,
+                block_bytes=int(storage_config.get('block-bytes', 4 * 1024 * 1024)),
+                flush_seconds=float(storage_config.get('flush-seconds', 300)),
+            )
+        else:
+            storage = DataStorage(storage_config['output_path'], data_label)
         logging.info(f"Моніторінг розпочато")
         line_chart = ChartStorage(chart_file)
 
-        detected: dict[Severity, int | None] = {
-            Severity.MINOR: None,
-            Severity.MAJOR: None,
-            Severity.INTRUSION: None,
-        }
+        alert_slot = alert_engine.slot(router_name)
+        sketch: TableSketch | None = None
 
-        global issue_counters
+        peer_index = PeerRouteIndex()
+        flap_config = config.get('flaps', {})
+        flap_tracker = FlapTracker(
+            half_life=float(flap_config.get('half-life', 900)),
+            penalty=float(flap_config.get('penalty', 1000)),
+            suppress=float(flap_config.get('suppress', 2000)),
+            reuse=float(flap_config.get('reuse', 750)),
+            max_penalty=float(flap_config.get('max-penalty', 12000)),
+            max_entries=int(flap_config.get('max-entries', 100000)),
+        )
 
-        seed = 0
         while True:
             # Отримання BGP-даних
-            bgp_data = parser.get_bgp_data()
-
-            # Ініціалізація збереження
-            storage = DataStorage(storage_config['output_path'])
+            # Блокуючі запити REST API виконуються поза циклом подій, щоб маршрутизатори опитувались паралельно
+            bgp_data = await asyncio.to_thread(parser.get_bgp_data)
+            added_routes, removed_routes = [], []
+            if previous_data:
+                added_routes, removed_routes = await asyncio.to_thread(
+                    route_diff, previous_data.get("routes", []), bgp_data.get("routes", []), key=route_element)
+            if storage_config.get('sketch', False):
+                # Компактний ескіз таблиці для порівняння архівних знімків без повних таблиць;
+                # після першого опитування оновлюється лише за змінами маршрутів
+                if sketch is None:
+                    sketch = TableSketch.from_routes(bgp_data.get('routes', []))
+                else:
+                    sketch.update(added_routes, removed_routes)
+                bgp_data['sketch'] = sketch.to_text()
 
             # Збереження даних
             storage.save_data(bgp_data)
             logging.info("Дані успішно збережено")
 
+            if consistency:
+                # Кореляція з останніми знімками інших маршрутизаторів
+                result = consistency.update(router_name, bgp_data)
+                if result:
+                    report_inconsistencies(*result)
+
             etalon_diff, previous_diff, gateway_diff = [0, 0, 0], [0,0,0], [0, 0, 0]
 
             if etalon_data:
                 session_diff = levenshtein_distance(clear_sessions(etalon_data.get("sessions", [])),
                                                clear_routes(bgp_data.get("sessions", [])))
 
-                routes_diff = levenshtein_distance(clear_routes(etalon_data.get("routes", [])),
-                                                  clear_routes(bgp_data.get("routes", [])))
+                routes_diff = await asyncio.to_thread(levenshtein_distance, clear_routes(etalon_data.get("routes", [])),
+                                                      clear_routes(bgp_data.get("routes", [])))
                 gateway_diff = levenshtein_distance(etalon_data.get("gateways", []), bgp_data.get("etalon_gateways", []))
 
                 session_diff_normalised, routes_diff_normalised, gateway_diff_normalised  = (
@@ -146,25 +265,17 @@ async def bgp_observer(chart_file: str):
                 else:
                     logging.critical("Сессії відмінні від еталону: -")
 
-                if etalon_data["routes"] == bgp_data["routes"]:
-                    detected[Severity.INTRUSION], detected[Severity.MINOR], detected[Severity.MAJOR] = None, None, None
-                else:
+                if etalon_data["routes"] != bgp_data["routes"]:
                     if routes_diff_normalised[1] > minor_alert:
                         logging.critical("Виявлено нові маршрути, кількість доданих маршрутів: %d", routes_diff[1])
-                        if not detected[Severity.INTRUSION]:
-                            detected[Severity.INTRUSION] = seed
 
                     if routes_diff_normalised[0] > routes_diff_normalised[1]:
                         logging.critical("Маршрути відмінні від еталону, відстань: %d", routes_diff[0])
 
                     if 0 < routes_diff_normalised[2] < minor_alert:
                         logging.critical("Часткова відмова, кількість: %d", routes_diff[2])
-                        if not detected[Severity.MINOR]:
-                            detected[Severity.MINOR] = seed
                     elif major_alert < routes_diff[2]:
                         logging.critical("Відмова обладнання, кількість: %d", routes_diff[2])
-                        if not detected[Severity.MAJOR]:
-                            detected[Severity.MAJOR] = seed
 
                 if gateway_diff[0] < minor_alert:
                     pass
@@ -172,6 +283,32 @@ async def bgp_observer(chart_file: str):
                     logging.critical("Відбулись зміни у шлюзах, відстань: %d", gateway_diff[0])
             else:
                 etalon_data = bgp_data
+                if chunk_store and baseline_name:
+                    chunk_store.save_baseline(router_name, baseline_name, etalon_data)
+                    logging.warning(f"Перше опитування збережено як еталон '{baseline_name}'; наступні запуски "
+                                    f"використовуватимуть його, доки не задано analyze.etalon")
+
+            peer_index.update_sessions(bgp_data.get("sessions", []))
+            changed_prefixes: set[int] = set()
+            flapping: set[int] = set()
+            now = time.monotonic()
+            if previous_data:
+                added_routes, removed_routes = drop_distance_changes(added_routes, removed_routes)
+                report_peer_changes(router_name, peer_index.apply(added_routes, removed_routes))
+
+                changed_prefixes = {route_prefix_key(route) for route in added_routes + removed_routes}
+                for prefix in changed_prefixes:
+                    flap_tracker.record(prefix, now)
+                flapping = {prefix for prefix in changed_prefixes if flap_tracker.is_suppressed(prefix, now)}
+            else:
+                peer_index.rebuild(bgp_data.get("routes", []))
+
+            # Зміни лише у префіксах з флапінгом не підвищують рівень тривоги (RFC 2439)
+            suppressed = bool(changed_prefixes) and changed_prefixes <= flapping
+            event = alert_engine.evaluate(alert_slot, etalon_diff[1], etalon_diff[2],
+                                          len(etalon_data.get("routes", [])), suppressed)
+            if event:
+                report_alert(event, alert_engine)
 
             if previous_data:
                 if previous_data["sessions"] == bgp_data["sessions"]:
@@ -179,8 +316,8 @@ async def bgp_observer(chart_file: str):
                 else:
                     logging.critical("Відбулись зміни у сессіях у інтервалі часу: -")
 
-                routes_diff = levenshtein_distance(clear_routes(previous_data.get("routes", [])),
-                                                  clear_routes(bgp_data.get("routes", [])))
+                routes_diff = await asyncio.to_thread(levenshtein_distance, clear_routes(previous_data.get("routes", [])),
+                                                      clear_routes(bgp_data.get("routes", [])))
                 routes_diff_normalised = normalize(routes_diff, len(previous_data.get("routes", [])))
 
                 if previous_data["routes"] == bgp_data["routes"]:
@@ -188,19 +325,11 @@ async def bgp_observer(chart_file: str):
                         logging.info("Таблиця маршрутів відновилась до еталонно")
                     else:
                         logging.info("Змін у маршрутах не відбулось")
+                elif suppressed:
+                    logging.warning("Зміни лише у маршрутах з флапінгом (пригнічено): %s", ", ".join(map(format_prefix, sorted(flapping))))
                 else:
                     logging.critical("Відбулись зміни у маршрутах, відстань: %d", routes_diff_normalised[0])
 
-                    if detected[Severity.INTRUSION] and detected[Severity.INTRUSION] == seed:
-                        show_message(Severity.INTRUSION, "Втручання", "Підозра на втручання")
-                        issue_counters[Severity.INTRUSION] += 1
-                    if detected[Severity.MINOR] and detected[Severity.MINOR] == seed:
-                        show_message(Severity.MINOR, "Відмова", "Виникла відмова у з'єднаннях")
-                        issue_counters[Severity.MINOR] += 1
-                    if detected[Severity.MAJOR] and detected[Severity.MAJOR] == seed:
-                        show_message(Severity.MAJOR, "Відмова", "Виникла значна відмова")
-                        issue_counters[Severity.MAJOR] += 1
-
                 previous_diff = routes_diff
 
                 gateway_diff = levenshtein_distance(previous_data.get("gateways", []),bgp_data.get("gateways", []))
@@ -212,12 +341,16 @@ async def bgp_observer(chart_file: str):
                     logging.critical("Відбулись зміни у шлюзах, відстань: %d", gateway_diff_normalised[0])
 
             previous_data = bgp_data
-            line_chart.save_data(
-                etalon_diff[0]/max(len(etalon_data.get("routes", [])), 1),
-                previous_diff[0]/max(len(previous_data.get("routes", [])), 1)
-            )
+            etalon_score = etalon_diff[0]/max(len(etalon_data.get("routes", [])), 1)
+            previous_score = previous_diff[0]/max(len(previous_data.get("routes", [])), 1)
+            line_chart.save_data(etalon_score, previous_score)
+            event_hub.publish_scores(router_name, etalon_score, previous_score)
 
-            seed += 1
+            flap_stats = flap_tracker.stats(now)
+            if flap_stats['suppressed']:
+                logging.info("Флапінг маршрутів: відстежується %d, пригнічено %d, найбільший штраф %.0f",
+                             flap_stats['tracked'], flap_stats['suppressed'], flap_stats['max-penalty'])
+            event_hub.publish_metrics(router_name, {'flaps': flap_stats})
 
             await asyncio.sleep(running_config['interval'])
     except KeyboardInterrupt:
@@ -227,40 +360,73 @@ async def bgp_observer(chart_file: str):
         logging.error(f"Помилка виконання програми: {e}")
         logging.exception(e)
         stop_event.set()
+        if consistency:
+            # Інакше раунди звірки чекатимуть знімка цього маршрутизатора без кінця
+            result = consistency.remove(router_name)
+            if result:
+                report_inconsistencies(*result)
     finally:
+        if isinstance(storage, CompressedDataStorage):
+            storage.close()
         mikrotik.close()
 
-def update_plot(frame):
-    global data_reader
+async def run_monitoring(chart_file: str):
+    """Запуск спостерігача разом із панеллю моніторингу (якщо увімкнена у конфігурації)."""
+    # Налаштування логування
+    setup_logging(config.get('logging'))
+
+    dashboard_config = config.get('dashboard', {})
+    server = None
+    if dashboard_config.get('enabled', False):
+        server = DashboardServer(event_hub, dashboard_config.get('host', '127.0.0.1'), dashboard_config.get('port', 8080))
+        try:
+            await server.start()
+        except Exception:
+            # Наприклад, порт зайнято (помилку вже записано у журнал): маршрутизатори спостерігаються без панелі
+            logging.warning("Моніторинг продовжується без панелі моніторингу")
+            await server.stop()
+            server = None
+    try:
+        routers = router_configs()
+        etalons = load_etalons(config['analyze']['etalon']) if config['analyze'].get('etalon') else None
+        consistency = None
+        if len(routers) > 1 and config['analyze'].get('consistency', True):
+            consistency = ConsistencyMonitor(
+                [router['name'] for router in routers],
+                # Без еталонів очікуваним станом стає перший повний раунд опитування
+                expected={router['name']: etalons[router['etalon-router']]
+                          for router in routers if etalons and router['etalon-router'] in etalons} or None,
+            )
 
-    current_data = data_reader.get_data()
-    global config
-    max_points = config['charts']['max_records']
-
-    if current_data['timestamps']:
-        data_size = len(current_data['timestamps'])
-        if data_size <= max_points:
-            xdata = current_data['timestamps']
-            ydata1 = current_data['values1']
-            ydata2 = current_data['values2']
-        else:
-            xdata = current_data['timestamps'][data_size-max_points:]
-            ydata1 = current_data['values1'][data_size-max_points:]
-            ydata2 = current_data['values2'][data_size-max_points:]
-    else:
-        xdata = [datetime.now()]
-        ydata1 = [0]
-        ydata2 = [0]
+        analyze_config = config['analyze']
+        global alert_engine
+        alert_engine = AlertEngine(
+            minor_alert=float(analyze_config['minor-alert-level']),
+            major_alert=float(analyze_config['major-alert-level']),
+            clear_after=int(analyze_config.get('clear-after', 3)),
+            capacity=len(routers),
+        )
+
+        observers = []
+        for number, router_config in enumerate(routers):
+            # Графік головного вікна будується для першого маршрутизатора, для інших — окремі файли
+            root, ext = os.path.splitext(chart_file)
+            router_chart = chart_file if number == 0 else f"{root}_{router_config['name']}{ext}"
+            data_label = "overall" if len(routers) == 1 else router_config['name']
+            observers.append(bgp_observer(router_chart, router_config, alert_engine, data_label, etalons, consistency))
+        await asyncio.gather(*observers)
+    finally:
+        if server:
+            await server.stop()
 
-    line1.set_data(xdata, ydata1)
-    line2.set_data(xdata, ydata2)
+def update_plot(frame):
+    global data_reader, chart_renderer
 
-    ax.relim()
-    ax.autoscale_view(True, True, True)
-    # ax.xaxis.set_animated(True)
-    fig.autofmt_xdate()
+    # Забираємо лише нові точки (зчитувач їх не зберігає); проріджування та масштабування виконує ChartRenderer
+    new_data = data_reader.drain()
+    chart_renderer.append(new_data['timestamps'], new_data['values1'], new_data['values2'])
 
-    return line1, line2,
+    return chart_renderer.render()
 
 
 if __name__ == "__main__":
@@ -269,15 +435,20 @@ if __name__ == "__main__":
     output_path = config['storage']['chart_path'].format(now.strftime("%Y%m%d"), now.strftime("%H%M%S"))
 
     # Wrapper function to run the async task in a separate thread
-    def run_async_in_thread(loop, coro):
+    def run_async_in_thread(loop, task):
         asyncio.set_event_loop(loop) # Set the loop for this thread
-        loop.run_until_complete(coro) # Run the coroutine until it completes (or is cancelled)
+        try:
+            loop.run_until_complete(task) # Run the task until it completes (or is cancelled)
+        except asyncio.CancelledError:
+            pass
 
     # Create a new event loop for the async writer thread
     new_loop = asyncio.new_event_loop()
+    # Завдання зберігається, щоб при закритті вікна скасувати спостерігачів і закрити сховища
+    monitoring_task = new_loop.create_task(run_monitoring(output_path))
     observer_thread = threading.Thread(
         target=run_async_in_thread,
-        args=(new_loop, bgp_observer(output_path)),
+        args=(new_loop, monitoring_task),
         daemon=True
     )
     observer_thread.start()
@@ -286,6 +457,12 @@ if __name__ == "__main__":
     # 1. Initialize and Start the Data Reader Thread (remains synchronous for file reading)
     data_reader = DataReader(filename=output_path, interval=config['running']['interval'])
     data_reader.start()
+    chart_renderer = ChartRenderer(
+        ax, (line1, line2),
+        history_seconds=config['charts'].get('history_seconds', 0),
+        method=config['charts'].get('downsample', 'minmax'),
+        max_records=config['charts']['max_records'],
+    )
 
     # 2. Set up the Matplotlib Animation
     ani = animation.FuncAnimation(fig, update_plot, interval=config['running']['interval'] * 1000, blit=True)
@@ -306,6 +483,14 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         pass
 
+    # Скасування спостерігачів: блоки CompressedDataStorage записуються, сегменти отримують індекс
+    new_loop.call_soon_threadsafe(monitoring_task.cancel)
+    try:
+        observer_thread.join(timeout=30)
+    except KeyboardInterrupt:
+        pass
+
     print("Додаток припинено")
-    logging.info(f"Статистика по сесії: \n\tвиявлено втручань: {issue_counters[Severity.INTRUSION]},\n\tвиявлено відмов: {issue_counters[Severity.MINOR]},\n\tвиявлено значних відмов: {issue_counters[Severity.MAJOR]}.")
+    totals = alert_engine.totals() if alert_engine else {severity: 0 for severity in Severity}
+    logging.info(f"Статистика по сесії: \n\tвиявлено втручань: {totals[Severity.INTRUSION]},\n\tвиявлено відмов: {totals[Severity.MINOR]},\n\tвиявлено значних відмов: {totals[Severity.MAJOR]}.")
     root.destroy()
\ No newline at end of file
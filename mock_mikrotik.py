@@ -237,5 +237,35 @@ def ip_route():
     ])
 
 
+
+@app.route('/rest/ipv6/route', methods=['GET'])
+@require_auth
+def ipv6_route():
+    routes = [
+        {
+            "router-id": "4.4.4.4",
+            "dst-address": "2001:db8:1::/48",
+            "gateway": "fe80::1%ether1",
+            "distance": "200"
+        },
+        {
+            "router-id": "4.4.4.4",
+            "dst-address": "2001:db8:2::/48",
+            "gateway": "fe80::2%ether2",
+            "distance": "200"
+        },
+        {
+            "router-id": "4.4.4.4",
+            "dst-address": "2001:db8:5::/48",
+            "gateway": "fe80::5%ether5",
+            "distance": "200"
+        }
+    ]
+    return jsonify(routes) if random.random() < 0.1 else jsonify([
+        r for r in routes
+        if random.random() > 0.5
+    ])
+
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,220 @@
+import random
+import time
+from enum import Enum
+from typing import NamedTuple
+
+import numpy as np
+
+NONE = -1
+
+
+class Severity(Enum):
+    MINOR = 0
+    MAJOR = 1
+    INTRUSION = 2
+
+
+class AlertKind(Enum):
+    RAISE = 0       # виникла тривога (рівень був відсутній)
+    ESCALATE = 1    # рівень тривоги підвищився
+    CLEAR = 2       # тривогу знято після clear_after послідовних оцінок без порушень
+
+
+class AlertEvent(NamedTuple):
+    """Подія зміни стану тривоги маршрутизатора."""
+    kind: AlertKind
+    router: str
+    severity: Severity
+    previous: Severity | None
+
+
+def target_severity(inserted, deleted, etalon_len, minor_alert: float, major_alert: float):
+    """
+    Найвищий рівень, умову якого виконано (NONE, якщо жодного); працює як з числами, так і з масивами numpy.
+    Args:
+        inserted: Кількість доданих відносно еталону маршрутів (вставки відстані Левенштейна).
+        deleted: Кількість видалених маршрутів.
+        etalon_len: Кількість маршрутів еталону.
+    """
+    inserted, deleted, base = np.asarray(inserted), np.asarray(deleted), np.maximum(etalon_len, 1)
+    intrusion = inserted / base > minor_alert
+    minor = (0 < deleted) & (deleted / base < minor_alert)
+    # Як і раніше у bgp_observer, значна відмова порівнює поріг з кількістю видалених маршрутів
+    major = ~minor & (major_alert < deleted)
+    return np.where(intrusion, Severity.INTRUSION.value,
+                    np.where(major, Severity.MAJOR.value, np.where(minor, Severity.MINOR.value, NONE)))
+
+
+class AlertEngine:
+    """
+    Клас машини станів тривог з гістерезисом. Стан кожного маршрутизатора зберігається
+    у заздалегідь виділених масивах (слот на маршрутизатор): поточний рівень тривоги,
+    лічильник послідовних оцінок без порушень і лічильники подій. Рівень лише зростає
+    (RAISE/ESCALATE) і знімається (CLEAR) тільки після clear_after оцінок без порушень.
+    """
+    def __init__(self, minor_alert: float, major_alert: float, clear_after: int = 3, capacity: int = 64):
+        self.minor_alert = minor_alert
+        self.major_alert = major_alert
+        self.clear_after = clear_after
+        self.routers: list[str] = []
+        self.slots: dict[str, int] = {}
+        self.level = np.full(capacity, NONE, dtype=np.int8)
+        self.clean = np.zeros(capacity, dtype=np.int32)
+        self.counts = np.zeros((capacity, len(Severity)), dtype=np.int64)
+
+    def slot(self, router: str) -> int:
+        """Слот стану маршрутизатора; масиви розширюються удвічі лише при вичерпанні місця."""
+        number = self.slots.get(router)
+        if number is None:
+            number = self.slots[router] = len(self.routers)
+            self.routers.append(router)
+            if number >= len(self.level):
+                grow = len(self.level)
+                self.level = np.concatenate((self.level, np.full(grow, NONE, dtype=np.int8)))
+                self.clean = np.concatenate((self.clean, np.zeros(grow, dtype=np.int32)))
+                self.counts = np.concatenate((self.counts, np.zeros((grow, len(Severity)), dtype=np.int64)))
+        return number
+
+    def evaluate(self, slot: int, inserted: int, deleted: int, etalon_len: int,
+                 suppressed: bool = False) -> AlertEvent | None:
+        """
+        Оцінка одного результату порівняння з еталоном.
+        Args:
+            slot: Слот маршрутизатора (AlertEngine.slot).
+            inserted: Вставки відстані Левенштейна до еталону.
+            deleted: Видалення відстані Левенштейна до еталону.
+            etalon_len: Кількість маршрутів еталону.
+            suppressed: Зміни стосуються лише пригнічених (флапінг) префіксів — підвищення рівня не виконується.
+        Returns:
+            AlertEvent | None: Подія, якщо стан змінився.
+        """
+        # Те саме, що target_severity, але без створення масивів для однієї оцінки
+        base = etalon_len if etalon_len > 0 else 1
+        if inserted / base > self.minor_alert:
+            target = Severity.INTRUSION.value
+        elif 0 < deleted and deleted / base < self.minor_alert:
+            target = Severity.MINOR.value
+        elif self.major_alert < deleted:
+            target = Severity.MAJOR.value
+        else:
+            target = NONE
+        level = int(self.level[slot])
+
+        if target == NONE:
+            if level == NONE:
+                return None
+            clean = self.clean[slot] = self.clean[slot] + 1
+            if clean < self.clear_after:
+                return None
+            self.level[slot], self.clean[slot] = NONE, 0
+            return AlertEvent(AlertKind.CLEAR, self.routers[slot], Severity(level), None)
+
+        self.clean[slot] = 0
+        if target <= level or suppressed:
+            return None
+        self.level[slot] = target
+        self.counts[slot, target] += 1
+        return AlertEvent(AlertKind.RAISE if level == NONE else AlertKind.ESCALATE, self.routers[slot],
+                          Severity(target), None if level == NONE else Severity(level))
+
+    def evaluate_batch(self, slots: np.ndarray, inserted: np.ndarray, deleted: np.ndarray, etalon_len: np.ndarray,
+                       suppressed: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Векторизована оцінка одного раунду опитування для багатьох маршрутизаторів
+        (кожен слот не більше одного разу в пакеті).
+        Returns:
+            tuple: (слоти, види подій AlertKind.value, рівні) для маршрутизаторів, стан яких змінився.
+        """
+        target = target_severity(inserted, deleted, etalon_len, self.minor_alert, self.major_alert)
+        level = self.level[slots]
+        violated = target != NONE
+
+        clean = np.where(violated, 0, self.clean[slots] + (level != NONE))
+        cleared = (level != NONE) & (clean >= self.clear_after)
+        raised = violated & (target > level)
+        if suppressed is not None:
+            raised &= ~suppressed
+
+        new_level = np.where(raised, target, np.where(cleared, NONE, level)).astype(np.int8)
+        self.level[slots] = new_level
+        self.clean[slots] = np.where(cleared, 0, clean)
+        np.add.at(self.counts, (slots[raised], target[raised]), 1)
+
+        changed = raised | cleared
+        kinds = np.where(cleared, AlertKind.CLEAR.value,
+                         np.where(level == NONE, AlertKind.RAISE.value, AlertKind.ESCALATE.value))
+        return slots[changed], kinds[changed], np.where(cleared, level, new_level)[changed]
+
+    def router_counts(self, router: str) -> dict[Severity, int]:
+        """Кількість підвищень до кожного рівня для одного маршрутизатора."""
+        counts = self.counts[self.slot(router)]
+        return {severity: int(counts[severity.value]) for severity in Severity}
+
+    def totals(self) -> dict[Severity, int]:
+        """Кількість підвищень до кожного рівня по всіх маршрутизаторах."""
+        counts = self.counts[:len(self.routers)].sum(axis=0)
+        return {severity: int(counts[severity.value]) for severity in Severity}
+
+
+def replay(target: np.ndarray, clear_after: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Векторизоване відтворення AlertEngine для історії одного маршрутизатора (без пригнічення).
+    Args:
+        target: Рівні target_severity для кожного знімка.
+        clear_after: Кількість послідовних оцінок без порушень для зняття тривоги.
+    Returns:
+        tuple: (рівень тривоги після кожного знімка, вид події AlertKind.value або NONE).
+    """
+    index = np.arange(len(target))
+    violated = target != NONE
+    # Довжина серії оцінок без порушень; тривога знімається, коли серія досягає clear_after
+    run = index - np.maximum.accumulate(np.where(violated, index, -1))
+    episode = np.cumsum(run == clear_after)
+    # Поточний рівень — максимум цілей у межах епізоду (епізоди зростають, тож зсув на 4 їх розділяє)
+    level = np.maximum.accumulate(target + 4 * episode) - 4 * episode
+    previous = np.concatenate(([NONE], level[:-1]))
+    cleared = (run == clear_after) & (previous != NONE)
+
+    kinds = np.full(len(target), NONE)
+    kinds[(level != NONE) & (previous == NONE)] = AlertKind.RAISE.value
+    kinds[(level > previous) & (previous != NONE)] = AlertKind.ESCALATE.value
+    kinds[cleared] = AlertKind.CLEAR.value
+    return level, kinds
+
+
+def benchmark(routers: int = 10000, rounds: int = 300) -> float:
+    """
+    Вимірювання пропускної здатності AlertEngine.
+    Args:
+        routers: Кількість маршрутизаторів (слотів).
+        rounds: Кількість раундів опитування.
+    Returns:
+        float: Оцінок за секунду у пакетному режимі.
+    """
+    engine = AlertEngine(0.01, 0.3, capacity=routers)
+    slots = np.array([engine.slot(f"router{i}") for i in range(routers)])
+    rng = np.random.default_rng(0)
+    etalon_len = np.full(routers, 1000)
+    inserted = rng.integers(0, 2, (rounds, routers)) * rng.integers(0, 30, (rounds, routers))
+    deleted = rng.integers(0, 2, (rounds, routers)) * rng.integers(0, 3, (rounds, routers))
+
+    started = time.perf_counter()
+    events = 0
+    for number in range(rounds):
+        events += len(engine.evaluate_batch(slots, inserted[number], deleted[number], etalon_len)[0])
+    elapsed = time.perf_counter() - started
+    rate = routers * rounds / elapsed
+    print(f"AlertEngine.evaluate_batch: {routers * rounds} оцінок за {elapsed:.2f} с, {rate:,.0f} оцінок/с, подій: {events}")
+
+    samples = [(random.randrange(routers), random.randrange(30), random.randrange(3)) for _ in range(200000)]
+    evaluate = engine.evaluate
+    started = time.perf_counter()
+    for slot, ins, dels in samples:
+        evaluate(slot, ins, dels, 1000)
+    scalar = len(samples) / (time.perf_counter() - started)
+    print(f"AlertEngine.evaluate: {scalar:,.0f} оцінок/с")
+    return rate
+
+
+if __name__ == '__main__':
+    benchmark()
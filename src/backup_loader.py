@@ -0,0 +1,435 @@
+import glob
+import logging
+import os
+import re
+import shlex
+import struct
+from datetime import datetime
+
+from src.utils import format_prefix, network_key, prefix_key, route_sort_key
+
+# Сигнатури файлів резервних копій RouterOS
+BACKUP_MAGIC = 0xB1A1AC88
+ENCRYPTED_BACKUP_MAGICS = (0x7291A8EF, 0xA7A9A1B1)
+
+# Поля записів (nv::message) у базах конфігурації резервної копії
+FIELD_ID = 0xFE0001
+FIELD_DISABLED = 0xFE000A
+FIELD_NAME = 0xFE0010
+
+# r5/routing/ubgp/conn, r5/routing/ubgp/cfg — BGP RouterOS v7
+CONN_AS = 0x2C2003
+CONN_ROUTER_ID = 0x2C2009
+CONN_REMOTE_AS = 0x2C2011
+CONN_LOCAL = 0x2C2201
+CONN_REMOTE = 0x2C2202
+CONN_OUTPUT_NETWORK = 0x2C201A
+ADDRESS_IP = 0xFEFF20
+ADDRESS_PREFIX = 0xFEFF25
+
+# bgconf/peer, bgconf/general — BGP RouterOS v6
+PEER_REMOTE_ADDRESS = 0x01
+PEER_REMOTE_AS = 0x02
+INSTANCE_AS = 0x02
+INSTANCE_ROUTER_ID = 0x03
+
+# net/addrs — адреси інтерфейсів
+ADDR_ADDRESS = 0x01
+ADDR_NETWORK = 0x02
+ADDR_NETMASK = 0x03
+
+# system — ідентифікатор маршрутизатора
+SYSTEM_IDENTITY = 0x0C
+
+BACKUP_TABLES = (
+    'system', 'net/addrs',
+    'r5/routing/ubgp/conn', 'r5/routing/ubgp/cfg',
+    'bgconf/peer', 'bgconf/general',
+)
+
+# Відстань для маршрутів iBGP та eBGP у RouterOS
+IBGP_DISTANCE = "200"
+EBGP_DISTANCE = "20"
+
+# Мережі точка-точка між маршрутизаторами не анонсуються як мережі BGP
+TRANSIT_PREFIXES = (30, 31)
+
+# Команди у тексті /export, що описують об'єкти конфігурації
+EXPORT_COMMANDS = ('add', 'set')
+
+backup_time_re = re.compile(r"(\d{8})-(\d{4})")
+
+
+def parse_message(data: bytes) -> dict[int, object]:
+    """
+    Розбір одного запису у двійковому форматі RouterOS (M2).
+    Args:
+        data: Байти запису, що починаються з сигнатури b'M2'.
+    Returns:
+        dict: Значення полів за їх ідентифікаторами (24 біти).
+    """
+    if data[:2] != b'M2':
+        raise ValueError("Запис не є повідомленням M2")
+
+    fields, offset = {}, 2
+    while offset < len(data):
+        key = int.from_bytes(data[offset:offset + 3], 'little')
+        kind = data[offset + 3]
+        offset += 4
+        if kind in (0x00, 0x01):
+            value = bool(kind)
+        elif kind == 0x08:
+            value, offset = data[offset:offset + 4], offset + 4
+        elif kind == 0x09:
+            value, offset = data[offset], offset + 1
+        elif kind == 0x10:
+            value, offset = data[offset:offset + 8], offset + 8
+        elif kind == 0x18:
+            value, offset = data[offset:offset + 16], offset + 16
+        elif kind in (0x20, 0x21, 0x28, 0x29, 0x30, 0x31):
+            # Непарний тип — коротка довжина (1 байт), парний — 2 байти
+            size_len = 1 if kind & 0x01 else 2
+            size = int.from_bytes(data[offset:offset + size_len], 'little')
+            offset += size_len
+            value, offset = data[offset:offset + size], offset + size
+            if kind in (0x28, 0x29):
+                value = parse_message(value)
+            elif kind in (0x20, 0x21):
+                value = value.decode('utf-8', errors='replace')
+        elif kind in (0x88, 0x90, 0x98):
+            # Масиви чисел та адрес IPv6 фіксованої довжини
+            width = {0x88: 4, 0x90: 8, 0x98: 16}[kind]
+            count = int.from_bytes(data[offset:offset + 2], 'little')
+            offset += 2
+            value = [data[offset + width * i:offset + width * (i + 1)] for i in range(count)]
+            offset += width * count
+        elif kind in (0xA0, 0xA8, 0xB0):
+            # Масиви рядків, повідомлень та двійкових даних змінної довжини
+            count = int.from_bytes(data[offset:offset + 2], 'little')
+            offset += 2
+            value = []
+            for _ in range(count):
+                size = int.from_bytes(data[offset:offset + 2], 'little')
+                item = data[offset + 2:offset + 2 + size]
+                if kind == 0xA0:
+                    item = item.decode('utf-8', errors='replace')
+                elif kind == 0xA8:
+                    item = parse_message(item)
+                value.append(item)
+                offset += 2 + size
+        else:
+            raise ValueError(f"Невідомий тип поля 0x{kind:02x}")
+        fields[key] = value
+    return fields
+
+
+def read_backup_tables(path: str, names: tuple[str, ...]) -> dict[str, list[dict[int, object]]]:
+    """
+    Читання незашифрованої резервної копії RouterOS (.backup).
+    Args:
+        path: Шлях до файлу.
+        names: Бази конфігурації, записи яких потрібно розібрати.
+    Returns:
+        dict: Записи кожної бази конфігурації (наприклад, 'net/addrs').
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    magic, size = struct.unpack_from('<II', data, 0)
+    if magic in ENCRYPTED_BACKUP_MAGICS:
+        raise ValueError(f"Резервна копія {path} зашифрована, використайте /export")
+    if magic != BACKUP_MAGIC or size != len(data):
+        raise ValueError(f"Файл {path} не є резервною копією RouterOS")
+
+    tables, offset = {}, 8
+    while offset < len(data):
+        (name_len,) = struct.unpack_from('<I', data, offset)
+        name = data[offset + 4:offset + 4 + name_len].decode('utf-8')
+        offset += 4 + name_len
+        (idx_len,) = struct.unpack_from('<I', data, offset)
+        offset += 4 + idx_len
+        (dat_len,) = struct.unpack_from('<I', data, offset)
+        dat = data[offset + 4:offset + 4 + dat_len]
+        offset += 4 + dat_len
+        if name not in names:
+            continue
+
+        # Кожен запис .dat: довжина (2 байти, включно з собою) та повідомлення M2
+        records, position = [], 0
+        while position < len(dat):
+            record_len = int.from_bytes(dat[position:position + 2], 'little')
+            records.append(parse_message(dat[position + 2:position + record_len]))
+            position += record_len
+        tables[name] = records
+    return tables
+
+
+def ip_from_bytes(value: bytes) -> str:
+    return ".".join(str(octet) for octet in value)
+
+
+def prefix_from_mask(value: bytes) -> int:
+    return bin(int.from_bytes(value, 'big')).count("1")
+
+
+def read_backup(path: str) -> dict:
+    """
+    Отримання BGP-конфігурації та адрес маршрутизатора з резервної копії.
+    Args:
+        path: Шлях до файлу .backup.
+    Returns:
+        dict: Конфігурація маршрутизатора (див. build_etalons).
+    """
+    tables = read_backup_tables(path, BACKUP_TABLES)
+    router = {
+        'identity': os.path.basename(path).split('-')[0],
+        'router-id': '',
+        'as': '',
+        'sessions': [],
+        'addresses': [],
+        'networks': [],
+        'timestamp': backup_timestamp(path),
+    }
+
+    for record in tables.get('system', []):
+        if SYSTEM_IDENTITY in record:
+            router['identity'] = record[SYSTEM_IDENTITY]
+
+    for record in tables.get('net/addrs', []):
+        if record.get(FIELD_DISABLED) or ADDR_ADDRESS not in record or ADDR_NETMASK not in record:
+            continue
+        prefix = prefix_from_mask(record[ADDR_NETMASK])
+        router['addresses'].append(f"{ip_from_bytes(record[ADDR_ADDRESS])}/{prefix}")
+
+    connections = tables.get('r5/routing/ubgp/conn')
+    if connections:
+        # RouterOS v7 (або конфігурація v6, перетворена для v7)
+        for template in tables.get('r5/routing/ubgp/cfg', []):
+            if not template.get(FIELD_DISABLED) and CONN_ROUTER_ID in template:
+                router['router-id'] = ip_from_bytes(template[CONN_ROUTER_ID])
+                router['as'] = str(int.from_bytes(template[CONN_AS], 'little'))
+        for connection in connections:
+            if connection.get(FIELD_DISABLED):
+                continue
+            local = connection.get(CONN_LOCAL, {})
+            remote = connection.get(CONN_REMOTE, {})
+            router['sessions'].append({
+                'name': connection.get(FIELD_NAME, ''),
+                'as': str(int.from_bytes(connection[CONN_AS], 'little')) if CONN_AS in connection else router['as'],
+                'router-id': ip_from_bytes(connection[CONN_ROUTER_ID]) if CONN_ROUTER_ID in connection else router['router-id'],
+                'local.address': ip_from_bytes(local[ADDRESS_IP]) if ADDRESS_IP in local else '',
+                'remote.as': str(int.from_bytes(connection[CONN_REMOTE_AS], 'little')) if CONN_REMOTE_AS in connection else '',
+                'remote.address': f"{ip_from_bytes(remote[ADDRESS_IP])}/{remote.get(ADDRESS_PREFIX, 32)}" if ADDRESS_IP in remote else '',
+            })
+    else:
+        # RouterOS v6
+        for instance in tables.get('bgconf/general', []):
+            if not instance.get(FIELD_DISABLED) and isinstance(instance.get(INSTANCE_ROUTER_ID), bytes):
+                router['router-id'] = ip_from_bytes(instance[INSTANCE_ROUTER_ID])
+                router['as'] = str(int.from_bytes(instance[INSTANCE_AS], 'little'))
+        for peer in tables.get('bgconf/peer', []):
+            if peer.get(FIELD_DISABLED):
+                continue
+            router['sessions'].append({
+                'name': peer.get(FIELD_NAME, ''),
+                'as': router['as'],
+                'router-id': router['router-id'],
+                'local.address': '',
+                'remote.as': str(int.from_bytes(peer[PEER_REMOTE_AS], 'little')),
+                'remote.address': f"{ip_from_bytes(peer[PEER_REMOTE_ADDRESS])}/32",
+            })
+
+    return router
+
+
+def export_commands(text: str):
+    """Розбиття тексту /export на пари (розділ, параметри команди)."""
+    section = ''
+    for line in re.sub(r"\\\n\s*", "", text).splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        words = shlex.split(line)
+        if words[0].startswith('/'):
+            # Шлях розділу може складатись з кількох слів: /routing bgp connection
+            position = next((i for i, word in enumerate(words) if word in EXPORT_COMMANDS), len(words))
+            section, words = " ".join(words[:position]), words[position:]
+            if not words:
+                continue
+
+        command, params, prefix = words[0], {}, ''
+        for word in words[1:]:
+            key, _, value = word.partition('=')
+            # У RouterOS v7 параметри з тим самим префіксом скорочуються: remote.address=... .as=...
+            if key.startswith('.'):
+                key = prefix + key
+            elif '.' in key:
+                prefix = key.split('.')[0]
+            params[key] = value
+        yield section, command, params
+
+
+def read_export(path: str) -> dict:
+    """
+    Отримання BGP-конфігурації та адрес маршрутизатора з тексту /export.
+    Args:
+        path: Шлях до файлу .rsc.
+    Returns:
+        dict: Конфігурація маршрутизатора (див. build_etalons).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    router = {
+        'identity': os.path.splitext(os.path.basename(path))[0].split('-')[0],
+        'router-id': '',
+        'as': '',
+        'sessions': [],
+        'addresses': [],
+        'networks': [],
+        'timestamp': backup_timestamp(path),
+    }
+    address_lists: dict[str, list[str]] = {}
+    output_networks: set[str] = set()
+
+    # Рядки «set [ find ... ]» змінюють наявні записи і можуть не містити адреси, мережі чи сусіда
+    for section, command, params in export_commands(text):
+        if params.get('disabled') == 'yes':
+            continue
+        if section == '/system identity':
+            router['identity'] = params.get('name', router['identity'])
+        elif section == '/ip address':
+            if params.get('address'):
+                router['addresses'].append(params['address'])
+        elif section == '/ip firewall address-list':
+            if params.get('address'):
+                address_lists.setdefault(params.get('list', ''), []).append(params['address'])
+        elif section in ('/routing bgp template', '/routing bgp instance'):
+            router['as'] = params.get('as', router['as'])
+            router['router-id'] = params.get('router-id', router['router-id'])
+        elif section == '/routing bgp network':
+            if params.get('network'):
+                router['networks'].append(params['network'])
+        elif section == '/routing bgp connection' and params.get('remote.address'):
+            output_networks.add(params.get('output.network', ''))
+            router['sessions'].append({
+                'name': params.get('name', ''),
+                'as': params.get('as', router['as']),
+                'router-id': params.get('router-id', router['router-id']),
+                'local.address': params.get('local.address', ''),
+                'remote.as': params.get('remote.as', ''),
+                'remote.address': params.get('remote.address', ''),
+            })
+        elif section == '/routing bgp peer' and params.get('remote-address'):
+            router['sessions'].append({
+                'name': params.get('name', ''),
+                'as': router['as'],
+                'router-id': router['router-id'],
+                'local.address': params.get('update-source', ''),
+                'remote.as': params.get('remote-as', ''),
+                'remote.address': params.get('remote-address', '') + '/32',
+            })
+
+    for name in output_networks:
+        router['networks'].extend(address_lists.get(name, []))
+    return router
+
+
+def backup_timestamp(path: str) -> str:
+    """Час створення копії з імені файлу (Router1-20250525-1052) або з часу модифікації."""
+    match = backup_time_re.search(os.path.basename(path))
+    if match:
+        return datetime.strptime("".join(match.groups()), "%Y%m%d%H%M").isoformat()
+    return datetime.utcfromtimestamp(os.path.getmtime(path)).isoformat()
+
+
+def load_router_config(path: str) -> dict:
+    """Завантаження конфігурації з .backup або тексту /export (визначається за вмістом)."""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(4)
+        if len(header) == 4 and struct.unpack('<I', header)[0] in (BACKUP_MAGIC,) + ENCRYPTED_BACKUP_MAGICS:
+            return read_backup(path)
+        return read_export(path)
+    except Exception as e:
+        logging.error(f"Помилка читання конфігурації {path}: {e}")
+        raise
+
+
+def network_of(address: str) -> str:
+    """Адреса мережі для адреси інтерфейсу у нотації CIDR (10.0.14.2/30 -> 10.0.14.0/30, також IPv6)."""
+    return format_prefix(network_key(prefix_key(address)))
+
+
+def advertised_networks(router: dict) -> list[str]:
+    """
+    Мережі, які маршрутизатор анонсує сусідам. Якщо список мереж BGP відсутній у копії,
+    використовуються мережі інтерфейсів без транзитних з'єднань точка-точка.
+    """
+    if router['networks']:
+        return list(router['networks'])
+    return [
+        network_of(address) for address in router['addresses']
+        if int(address.partition('/')[2] or 32) not in TRANSIT_PREFIXES
+    ]
+
+
+def build_etalons(routers: list[dict]) -> dict[str, dict]:
+    """
+    Побудова еталонних знімків у форматі BGPParser.get_bgp_data для кожного маршрутизатора.
+    Очікувані маршрути — мережі, що анонсуються безпосередніми сусідами, з яких виключено
+    мережі, підключені до самого маршрутизатора.
+    Args:
+        routers: Конфігурації, отримані read_backup/read_export.
+    Returns:
+        dict: Еталонні знімки за identity маршрутизатора.
+    """
+    owners = {}
+    for router in routers:
+        for address in router['addresses']:
+            owners[address.partition('/')[0]] = router
+
+    etalons = {}
+    for router in routers:
+        connected = {network_of(address) for address in router['addresses']}
+        routes = {}
+        for session in router['sessions']:
+            gateway = session['remote.address'].partition('/')[0]
+            peer = owners.get(gateway)
+            if peer is None:
+                logging.warning(f"{router['identity']}: не знайдено конфігурацію сусіда {gateway}")
+                continue
+            distance = IBGP_DISTANCE if session['remote.as'] == session['as'] else EBGP_DISTANCE
+            for network in advertised_networks(peer):
+                if network not in connected and network not in routes:
+                    routes[network] = {
+                        'router-id': router['router-id'],
+                        'dst-address': network,
+                        'gateway': gateway,
+                        'distance': distance,
+                    }
+
+        ordered_routes = sorted(routes.values(), key=route_sort_key)
+        etalons[router['identity']] = {
+            'timestamp': router['timestamp'],
+            'sessions': router['sessions'],
+            'routes': ordered_routes,
+            'gateways': sorted(set(route['gateway'] for route in ordered_routes)),
+            'networks': advertised_networks(router),
+        }
+        logging.info(f"Еталон {router['identity']}: {len(router['sessions'])} сесій і {len(ordered_routes)} маршрутів")
+    return etalons
+
+
+def load_etalons(pattern: str) -> dict[str, dict]:
+    """
+    Завантаження еталонів з усіх резервних копій/експортів за шаблоном шляху.
+    Args:
+        pattern: Шаблон шляху (наприклад, 'config/*.backup').
+    Returns:
+        dict: Еталонні знімки за identity маршрутизатора.
+    """
+    paths = sorted(glob.glob(pattern))
+    if not paths:
+        raise FileNotFoundError(f"Не знайдено файлів конфігурації за шаблоном {pattern}")
+    return build_etalons([load_router_config(path) for path in paths])
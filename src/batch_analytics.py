@@ -0,0 +1,302 @@
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from datetime import datetime, timezone
+from typing import Any, TextIO
+
+import numpy as np
+
+from config import load_config
+from src.alert_engine import NONE, AlertKind, Severity, replay, target_severity
+from src.chunk_store import ChunkStore, canonical_json
+from src.segment_log import read_segment, segment_paths
+from src.utils import levenshtein_distance, clear_routes, clear_sessions
+
+# Стовпці матриці метрик (один рядок на знімок)
+METRICS = (
+    'time',            # час знімка, секунди epoch (мітки BGPParser — UTC без зони)
+    'routes',          # кількість маршрутів
+    'etalon-routes',   # кількість маршрутів еталону
+    'etalon-dist',     # відстань Левенштейна до еталону: загальна, вставки, видалення
+    'etalon-ins',
+    'etalon-del',
+    'etalon-equal',    # таблиця збігається з еталоном
+    'previous-dist',   # відстань до попереднього знімка
+    'previous-equal',  # таблиця збігається з попереднім знімком
+    'sessions-dist',   # відстань сесій до еталону
+    'gateways-dist',   # відстань шлюзів до попереднього знімка
+)
+COLUMN = {name: number for number, name in enumerate(METRICS)}
+
+
+
+def archive_paths(pattern: str) -> list[str]:
+    """Файли архіву за шаблоном (або сегменти gzip базового шляху CompressedDataStorage)."""
+    return sorted(glob.glob(pattern)) or segment_paths(pattern)
+
+
+def iter_snapshots(pattern: str, chunk_path: str = 'data/store') -> Iterator[Mapping[str, Any]]:
+    """
+    Послідовне читання знімків з архіву історії у будь-якому з форматів storage.format.
+    Args:
+        pattern: Шлях або шаблон шляху до файлів DataStorage (json), сегментів (gzip; також
+            базовий шлях CompressedDataStorage) або файлів маніфестів (chunked).
+        chunk_path: Каталог сховища фрагментів для маніфестів.
+    """
+    store = None
+    for path in archive_paths(pattern):
+        if path.endswith('.gz'):
+            # Сегменти CompressedDataStorage — один JSON-рядок на знімок
+            yield from (json.loads(record) for record in read_segment(path))
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for value in iter_json_values(f):
+                if 'fields' in value and isinstance(value.get('routes'), dict):
+                    store = store or ChunkStore(chunk_path)
+                    value = store.load_snapshot(value)
+                yield value
+
+
+def iter_json_values(f: TextIO, block: int = 1 << 20) -> Iterator[Any]:
+    """
+    Потокове декодування послідовності JSON-об'єктів без роздільників (файли DataStorage):
+    у пам'яті лише поточний блок файлу та незавершений знімок.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+    while True:
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+        if pos < len(buffer):
+            try:
+                value, pos = decoder.raw_decode(buffer, pos)
+                yield value
+                continue
+            except json.JSONDecodeError:
+                # Об'єкт обрізано межею блоку; на кінці файлу — справжня помилка формату
+                if eof:
+                    raise
+        elif eof:
+            return
+        # Блок зростає разом з незавершеним об'єктом, щоб великі знімки не декодувались квадратично
+        chunk = f.read(max(block, len(buffer) - pos))
+        buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+
+
+def snapshot_time(snapshot: Mapping[str, Any]) -> float:
+    """Час знімка у секундах epoch; мітки без зони (datetime.utcnow у BGPParser) — це UTC."""
+    moment = datetime.fromisoformat(str(snapshot['timestamp']).replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def build_metrics(snapshots: Iterable[Mapping[str, Any]], etalon: Mapping[str, Any] | None = None) -> np.ndarray:
+    """
+    Побудова матриці метрик з історії знімків. Відстані для однакових таблиць
+    обчислюються один раз (більшість знімків у історії збігаються з попереднім).
+    Args:
+        snapshots: Знімки у порядку опитування.
+        etalon: Еталонний знімок; за замовчуванням — перший знімок історії, як у bgp_observer.
+    Returns:
+        np.ndarray: Матриця float64 розміром (кількість знімків, len(METRICS)).
+    """
+    rows: list[list[float]] = []
+    etalon_cache: dict[bytes, tuple[int, int, int]] = {}
+    etalon_routes = etalon_sessions = None
+    previous_routes = previous_gateways = None
+    previous_key = None
+
+    for snapshot in snapshots:
+        if etalon is None:
+            etalon = snapshot
+        if etalon_routes is None:
+            etalon_routes = clear_routes(etalon.get('routes', []))
+            etalon_sessions = clear_sessions(etalon.get('sessions', []))
+
+        routes = clear_routes(snapshot.get('routes', []))
+        gateways = sorted(snapshot.get('gateways', []))
+        key = hashlib.blake2b(canonical_json(routes), digest_size=16).digest()
+
+        etalon_diff = etalon_cache.get(key)
+        if etalon_diff is None:
+            etalon_diff = etalon_cache[key] = levenshtein_distance(etalon_routes, routes)
+
+        if previous_routes is None or key == previous_key:
+            previous_dist = 0
+        else:
+            previous_dist = levenshtein_distance(previous_routes, routes)[0]
+
+        rows.append([
+            snapshot_time(snapshot),
+            len(routes),
+            len(etalon_routes),
+            *etalon_diff,
+            float(etalon_diff[0] == 0),
+            previous_dist,
+            float(previous_routes is not None and key == previous_key),
+            levenshtein_distance(etalon_sessions, clear_sessions(snapshot.get('sessions', [])))[0],
+            levenshtein_distance(previous_gateways, gateways)[0] if previous_gateways is not None else 0,
+        ])
+        previous_routes, previous_gateways, previous_key = routes, gateways, key
+
+    return np.array(rows, dtype=np.float64).reshape(-1, len(METRICS))
+
+
+def rescore(metrics: np.ndarray, minor_alert: float, major_alert: float, clear_after: int = 3) -> dict[str, np.ndarray]:
+    """
+    Векторизований перерахунок оцінок і тривог для всієї історії (ті самі правила, що й AlertEngine).
+    Args:
+        metrics: Матриця build_metrics.
+        minor_alert: analyze.minor-alert-level.
+        major_alert: analyze.major-alert-level.
+        clear_after: analyze.clear-after.
+    Returns:
+        dict: Серії 'etalon-score', 'previous-score', 'target' (рівень, умову якого виконано),
+        'level' (рівень тривоги після знімка), 'events' (AlertKind.value або NONE) та
+        'transitions' (індекси знімків з подіями).
+    """
+    column = lambda name: metrics[:, COLUMN[name]]
+    target = target_severity(column('etalon-ins'), column('etalon-del'), column('etalon-routes'),
+                             minor_alert, major_alert)
+    level, events = replay(target, clear_after)
+    return {
+        'etalon-score': column('etalon-dist') / np.maximum(column('etalon-routes'), 1),
+        'previous-score': column('previous-dist') / np.maximum(column('routes'), 1),
+        'target': target,
+        'level': level,
+        'events': events,
+        'transitions': np.flatnonzero(events != NONE),
+    }
+
+
+def alert_counts(result: Mapping[str, np.ndarray]) -> dict[str, int]:
+    """Кількість тривог кожного рівня (RAISE та ESCALATE, як issue_counters)."""
+    raised = (result['events'] == AlertKind.RAISE.value) | (result['events'] == AlertKind.ESCALATE.value)
+    counts = np.bincount(result['level'][raised], minlength=len(Severity))
+    return {severity.name: int(counts[severity.value]) for severity in Severity}
+
+
+def write_chart(path: str, times: np.ndarray, etalon_score: np.ndarray, previous_score: np.ndarray) -> None:
+    """Запис серії у форматі ChartStorage (місцевий час) для побудови графіка DataReader."""
+    # Зміщення місцевого часу береться для кожної мітки (літній час); переходи припадають
+    # на межі чвертей години, тож зміщення обчислюється один раз на чверть години
+    quarters, inverse = np.unique(np.floor_divide(times, 900), return_inverse=True)
+    offsets = np.array([datetime.fromtimestamp(quarter * 900).astimezone().utcoffset().total_seconds()
+                        for quarter in quarters.tolist()])
+    local = (times + offsets[inverse]).astype('datetime64[s]')
+    stamps = np.char.replace(np.datetime_as_string(local, unit='s'), 'T', ' ')
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            f.writelines(f"{stamp};{first};{second};\n"
+                         for stamp, first, second in zip(stamps, etalon_score.tolist(), previous_score.tolist()))
+        logging.info(f"Дані збережено у {path}")
+    except Exception as e:
+        logging.error(f"Помилка збереження даних: {e}")
+        raise
+
+
+def load_metrics(pattern: str, cache: str = '', etalon: Mapping[str, Any] | None = None,
+                 chunk_path: str = 'data/store') -> np.ndarray:
+    """
+    Матриця метрик архіву; якщо задано cache (.npy), повторні запуски читають її з диска.
+    Поруч з кешем зберігається його ключ (<cache>.key): шаблон, файли архіву з розміром і часом
+    зміни та хеш еталона; за іншого архіву чи еталона матриця будується заново.
+    """
+    key = metrics_key(pattern, etalon)
+    key_path = cache + '.key'
+    if cache and os.path.exists(cache) and os.path.exists(key_path):
+        with open(key_path, 'r', encoding='utf-8') as f:
+            if f.read() == key:
+                return np.load(cache)
+        logging.info(f"Кеш {cache} створено для іншого архіву або еталона, метрики буде побудовано заново")
+    metrics = build_metrics(iter_snapshots(pattern, chunk_path), etalon)
+    if cache:
+        np.save(cache, metrics)
+        with open(key_path, 'w', encoding='utf-8') as f:
+            f.write(key)
+    return metrics
+
+
+def metrics_key(pattern: str, etalon: Mapping[str, Any] | None) -> str:
+    """Ключ кешу метрик: шаблон, стан файлів архіву та вміст еталона."""
+    files = [(path, os.path.getsize(path), os.path.getmtime(path)) for path in archive_paths(pattern)]
+    etalon_digest = hashlib.blake2b(canonical_json(dict(etalon)), digest_size=16).hexdigest() if etalon else ''
+    return hashlib.blake2b(canonical_json({'pattern': pattern, 'files': files, 'etalon': etalon_digest}),
+                           digest_size=16).hexdigest()
+
+
+def benchmark(snapshots: int = 5000000) -> float:
+    """
+    Вимірювання швидкості rescore на синтетичній матриці метрик.
+    Returns:
+        float: Знімків за секунду.
+    """
+    rng = np.random.default_rng(0)
+    metrics = np.zeros((snapshots, len(METRICS)))
+    metrics[:, COLUMN['time']] = np.arange(snapshots)
+    metrics[:, COLUMN['routes']] = metrics[:, COLUMN['etalon-routes']] = 20
+    metrics[:, COLUMN['etalon-ins']] = rng.integers(0, 2, snapshots) * rng.integers(0, 3, snapshots)
+    metrics[:, COLUMN['etalon-del']] = rng.integers(0, 2, snapshots) * rng.integers(0, 3, snapshots)
+    metrics[:, COLUMN['etalon-dist']] = metrics[:, COLUMN['etalon-ins']] + metrics[:, COLUMN['etalon-del']]
+    metrics[:, COLUMN['etalon-equal']] = metrics[:, COLUMN['etalon-dist']] == 0
+
+    started = time.perf_counter()
+    result = rescore(metrics, 0.01, 0.3)
+    elapsed = time.perf_counter() - started
+
+    rate = snapshots / elapsed
+    print(f"rescore: {snapshots} знімків за {elapsed:.2f} с, {rate:,.0f} знімків/с, тривоги: {alert_counts(result)}")
+    return rate
+
+
+def main() -> None:
+    config = load_config('config/config.yaml')
+    analyze_config = config['analyze']
+
+    parser = argparse.ArgumentParser(description="Перерахунок оцінок і тривог для збереженої історії знімків")
+    parser.add_argument('archive', nargs='?', help="шаблон шляху до архіву одного маршрутизатора (наприклад, "
+                                                   "'data/*_overall_*bgp_data.json*' або 'data/*_Router4_*bgp_data.json*')")
+    parser.add_argument('--output', default='data/rescored_line_chart.csv', help="файл нової серії графіка")
+    parser.add_argument('--cache', default='', help="файл .npy для кешування матриці метрик")
+    parser.add_argument('--minor', type=float, default=float(analyze_config['minor-alert-level']))
+    parser.add_argument('--major', type=float, default=float(analyze_config['major-alert-level']))
+    parser.add_argument('--clear-after', type=int, default=int(analyze_config.get('clear-after', 3)))
+    parser.add_argument('--etalon', default=analyze_config.get('etalon', ''), help="шаблон шляху до .backup/експорту")
+    parser.add_argument('--etalon-router', default=analyze_config.get('etalon-router', ''))
+    parser.add_argument('--benchmark', action='store_true', help="лише виміряти швидкість перерахунку")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        return
+    if not args.archive:
+        parser.error("не вказано архів історії")
+
+    etalon = None
+    if args.etalon:
+        from src.backup_loader import load_etalons
+        etalon = load_etalons(args.etalon)[args.etalon_router]
+
+    started = time.perf_counter()
+    metrics = load_metrics(args.archive, args.cache, etalon, config['storage'].get('chunk_path', 'data/store'))
+    if not len(metrics):
+        parser.error(f"архів {args.archive} не містить знімків")
+    loaded = time.perf_counter()
+    result = rescore(metrics, args.minor, args.major, args.clear_after)
+    write_chart(args.output, metrics[:, COLUMN['time']], result['etalon-score'], result['previous-score'])
+    finished = time.perf_counter()
+
+    print(f"Знімків: {len(metrics)}, метрики за {loaded - started:.2f} с, перерахунок за {finished - loaded:.2f} с")
+    print(f"Тривоги: {alert_counts(result)}, змін стану: {len(result['transitions'])}")
+    print(f"Серію графіка збережено у {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,30 @@
 import logging
 from datetime import datetime
 
+from requests.exceptions import HTTPError
+
+from src.utils import INVALID_PREFIX, route_prefix_key, route_sort_key
+
 class BGPParser:
     """Клас для отримання та обробки BGP-даних."""
-    def __init__(self, mikrotik_api):
+    def __init__(self, mikrotik_api, ipv6: bool = True):
         self.api = mikrotik_api
+        self.ipv6 = ipv6
+
+    def get_ipv6_routes(self):
+        """Отримання активних BGP-маршрутів IPv6 (порожній список, якщо IPv6 недоступний на маршрутизаторі)."""
+        if not self.ipv6:
+            return []
+        try:
+            return self.api.query("ipv6/route", params={"bgp": "true", "active": "true"})
+        except HTTPError as e:
+            # Пакет IPv6 вимкнено або відсутній (шлях не підтримується): більше не запитуємо.
+            # Інші помилки (тайм-аут, з'єднання) переривають лише поточне опитування.
+            if e.response is None or e.response.status_code not in (400, 404):
+                raise
+            logging.warning(f"Маршрути IPv6 недоступні, опитування лише IPv4: {e}")
+            self.ipv6 = False
+            return []
 
     def get_bgp_data(self):
         """Отримання даних про BGP-сесії та маршрути."""
@@ -15,6 +35,7 @@ class BGPParser:
             sessions = self.api.query("routing/bgp/connection")
             # Отримання BGP-маршрутів
             routes = self.api.query("ip/route", params={"bgp": "true", "active": "true"})
+            routes += self.get_ipv6_routes()
 
             # Форматування даних
             bgp_data = {
@@ -29,17 +50,20 @@ class BGPParser:
                         'remote.address': session.get('remote.address', ''),
                     } for session in sessions
                 ],
-                'routes': [
+                'routes': sorted((
                     {
                         'router-id': bgp_processes[0].get('router-id', ''),
                         'dst-address': route.get('dst-address', ''),
                         'gateway': route.get('gateway', ''),
                         'distance': route.get('distance', ''),
                     } for route in routes
-                ],
+                ), key=route_sort_key),
                 'gateways': list(set(route.get('gateway', '') for route in routes)),
             }
             logging.info(f"Отримано {len(sessions)} сесій і {len(routes)} маршрутів")
+            invalid = [route['dst-address'] for route in bgp_data['routes'] if route_prefix_key(route) == INVALID_PREFIX]
+            if invalid:
+                logging.warning(f"Маршрути з некоректною мережею ({len(invalid)}): {', '.join(invalid[:10])}")
             return bgp_data
         except Exception as e:
             logging.error(f"Помилка отримання BGP-даних: {e}")
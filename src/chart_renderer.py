@@ -0,0 +1,106 @@
+from datetime import datetime
+
+import numpy as np
+from matplotlib.dates import date2num
+
+from src.downsample import DOWNSAMPLERS
+
+# Запас праворуч від останньої точки (частка ширини вікна), щоб не перемасштабовувати вісь щокадру
+X_HEADROOM = 0.1
+# Мінімальна ширина вікна для самого початку спостереження, у добах (одна хвилина)
+MIN_SPAN = 1.0 / (24 * 60)
+
+
+class ChartRenderer:
+    """Клас для побудови графіка довгої історії з проріджуванням до роздільної здатності екрана."""
+    def __init__(self, ax, lines, history_seconds: float = 0, method: str = 'minmax', max_records: int = 0):
+        if method not in DOWNSAMPLERS and method != 'none':
+            raise ValueError(f"Невідомий метод проріджування: {method}")
+
+        self.ax = ax
+        self.lines = lines
+        self.method = method
+        self.max_records = max_records if method == 'none' else 0
+        # Без проріджування показуються останні max_records точок, і вісь охоплює їхній діапазон
+        self.history = 0.0 if self.max_records else history_seconds / 86400.0
+
+        self.size = 0
+        self.x = np.empty(1024)
+        self.values = [np.empty(1024) for _ in lines]
+        self.xlim: tuple[float, float] | None = None
+        self.dirty = True
+
+    def append(self, timestamps: list[datetime], *series: list[float]) -> None:
+        """Додавання нових точок до буферів з амортизованим розширенням."""
+        count = len(timestamps)
+        if not count:
+            return
+
+        required = self.size + count
+        if required > len(self.x):
+            # Перед розширенням відкидаємо точки, що вже не потрапляють на графік
+            self._compact()
+            required = self.size + count
+        if required > len(self.x):
+            capacity = max(required, 2 * len(self.x))
+            self.x = np.resize(self.x, capacity)
+            self.values = [np.resize(values, capacity) for values in self.values]
+
+        self.x[self.size:required] = date2num(timestamps)
+        for values, new_values in zip(self.values, series):
+            values[self.size:required] = new_values
+        self.size = required
+        self.dirty = True
+
+    def render(self) -> tuple:
+        """Оновлення ліній графіка; вісь перемасштабовується лише при зміні діапазону."""
+        if not self.dirty or not self.size:
+            return tuple(self.lines)
+
+        start = self._start()
+        x = self.x[start:self.size]
+
+        width = max(int(self.ax.bbox.width), 1)
+        for line, values in zip(self.lines, self.values):
+            y = values[start:self.size]
+            if self.method != 'none':
+                line.set_data(*DOWNSAMPLERS[self.method](x, y, width))
+            else:
+                line.set_data(x, y)
+
+        self._rescale(x[0], x[-1])
+        self.dirty = False
+        return tuple(self.lines)
+
+    def _start(self) -> int:
+        """Індекс першої точки, що потрапляє на графік (останні max_records точок або вікно історії)."""
+        if self.max_records:
+            return max(self.size - self.max_records, 0)
+        if self.history and self.size:
+            return int(np.searchsorted(self.x[:self.size], self.x[self.size - 1] - self.history))
+        return 0
+
+    def _compact(self) -> None:
+        """Зсув буферів на початок, щоб вони не зростали без меж (уся історія — лише при history_seconds: 0)."""
+        start = self._start()
+        if not start:
+            return
+        kept = self.size - start
+        self.x[:kept] = self.x[start:self.size]
+        for values in self.values:
+            values[:kept] = values[start:self.size]
+        self.size = kept
+
+    def _rescale(self, first: float, last: float) -> None:
+        # У режимі вікна історії ліва межа зсувається разом із правою, тож перевіряємо лише праву
+        if self.xlim and last <= self.xlim[1] and (self.history or self.xlim[0] <= first):
+            return
+
+        span = max(last - first, self.history, MIN_SPAN)
+        right = last + span * X_HEADROOM
+        left = last - self.history if self.history else first
+        self.xlim = (left, right)
+        self.ax.set_xlim(left, right)
+        # Повне перемальовування (осі, підписи) лише при зміні діапазону;
+        # анімація після цього кешує новий фон для blit
+        self.ax.figure.canvas.draw()
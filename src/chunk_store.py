@@ -0,0 +1,190 @@
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Iterator
+
+from src.peer_index import gateway_address
+from src.utils import route_sort_key
+
+# Поля знімка, що зберігаються безпосередньо у маніфесті (змінюються щоразу і малі за розміром)
+INLINE_FIELDS = ('timestamp',)
+
+
+def canonical_json(value: Any) -> bytes:
+    """Канонічна серіалізація: однаковий вміст завжди дає однакові байти і хеш."""
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class ChunkStore:
+    """
+    Клас контентно-адресованого сховища знімків. Знімок розбивається на фрагменти
+    (сесії, шлюзи, маршрути кожного сусіда), кожен фрагмент зберігається один раз під
+    ключем-хешем вмісту, а знімки та еталони є лише маніфестами з посиланнями на фрагменти.
+    """
+    def __init__(self, root: str, cache_size: int = 1024):
+        self.root = root
+        self.cache_size = cache_size
+        self.cache: OrderedDict[str, Any] = OrderedDict()
+        os.makedirs(os.path.join(self.root, 'chunks'), exist_ok=True)
+
+    def chunk_path(self, key: str) -> str:
+        return os.path.join(self.root, 'chunks', key[:2], f"{key}.json")
+
+    def put(self, value: Any) -> str:
+        """Збереження фрагмента; повертає його ключ. Повторний запис того самого вмісту не виконується."""
+        data = canonical_json(value)
+        key = hashlib.blake2b(data, digest_size=20).hexdigest()
+        path = self.chunk_path(key)
+        if key not in self.cache and not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Атомарний запис: частково записаний фрагмент ніколи не буде прочитано
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        self._remember(key, value)
+        return key
+
+    def get(self, key: str) -> Any:
+        """Читання фрагмента за ключем (з кешем останніх використаних фрагментів)."""
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        try:
+            with open(self.chunk_path(key), 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except Exception as e:
+            logging.error(f"Помилка читання фрагмента {key}: {e}")
+            raise
+        self._remember(key, value)
+        return value
+
+    def _remember(self, key: str, value: Any) -> None:
+        self.cache[key] = value
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def put_snapshot(self, snapshot: Mapping[str, Any]) -> dict[str, Any]:
+        """
+        Розбиття знімка на фрагменти.
+        Args:
+            snapshot: Знімок у форматі BGPParser.get_bgp_data.
+        Returns:
+            dict: Маніфест знімка з ключами фрагментів.
+        """
+        manifest: dict[str, Any] = {'fields': {}, 'routes': {}}
+        for name, value in snapshot.items():
+            if name in INLINE_FIELDS:
+                manifest[name] = value
+            elif name != 'routes':
+                manifest['fields'][name] = self.put(value)
+
+        peers: dict[str, list[dict[str, str]]] = {}
+        for route in snapshot.get('routes', []):
+            peers.setdefault(gateway_address(route.get('gateway', '')), []).append(route)
+        for gateway, routes in peers.items():
+            manifest['routes'][gateway] = self.put(routes)
+        return manifest
+
+    def load_snapshot(self, manifest: dict[str, Any]) -> 'LazySnapshot':
+        return LazySnapshot(self, manifest)
+
+    def baseline_path(self, router: str, name: str) -> str:
+        return os.path.join(self.root, 'baselines', router, f"{name}.json")
+
+    def save_baseline(self, router: str, name: str, snapshot: Mapping[str, Any]) -> dict[str, Any]:
+        """Збереження іменованого еталона маршрутизатора (наприклад, 'normal' або 'maintenance')."""
+        manifest = snapshot.manifest if isinstance(snapshot, LazySnapshot) else self.put_snapshot(snapshot)
+        path = self.baseline_path(router, name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=4)
+            logging.info(f"Еталон '{name}' для {router} збережено у {path}")
+        except Exception as e:
+            logging.error(f"Помилка збереження еталона: {e}")
+            raise
+        return manifest
+
+    def load_baseline(self, router: str, name: str) -> 'LazySnapshot | None':
+        """Завантаження іменованого еталона; None, якщо його ще не збережено."""
+        path = self.baseline_path(router, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return self.load_snapshot(json.load(f))
+
+    def baselines(self, router: str) -> list[str]:
+        directory = os.path.join(self.root, 'baselines', router)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.path.splitext(name)[0] for name in os.listdir(directory) if name.endswith('.json'))
+
+
+class LazySnapshot(Mapping):
+    """Знімок, що збирається з фрагментів лише під час першого звернення до відповідного поля."""
+    def __init__(self, store: ChunkStore, manifest: dict[str, Any]):
+        self.store = store
+        self.manifest = manifest
+        self.loaded: dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        if name in self.loaded:
+            return self.loaded[name]
+        if name in INLINE_FIELDS and name in self.manifest:
+            return self.manifest[name]
+        if name == 'routes':
+            routes = [route for key in self.manifest['routes'].values() for route in self.store.get(key)]
+            value = sorted(routes, key=route_sort_key)
+        elif name in self.manifest['fields']:
+            value = self.store.get(self.manifest['fields'][name])
+        else:
+            raise KeyError(name)
+        self.loaded[name] = value
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        yield from (name for name in INLINE_FIELDS if name in self.manifest)
+        yield from self.manifest['fields']
+        yield 'routes'
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def peer_routes(self, gateway: str) -> list[dict[str, str]]:
+        """Маршрути одного сусіда без збирання всієї таблиці."""
+        key = self.manifest['routes'].get(gateway_address(gateway))
+        return self.store.get(key) if key else []
+
+
+class ChunkedDataStorage:
+    """Клас для збереження знімків через контентно-адресоване сховище (маніфест на рядок JSON)."""
+    def __init__(self, output_path: str, store: ChunkStore, label: str = "overall"):
+        now = datetime.now()
+        self.output_path = output_path.format(now.strftime("%Y%m%d"), now.strftime("%H%M%S"), f"{label}_manifest")
+        self.store = store
+        os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+
+    def save_data(self, data: Mapping[str, Any]) -> dict[str, Any]:
+        """Збереження фрагментів знімка та дописування маніфесту у файл."""
+        try:
+            manifest = self.store.put_snapshot(data)
+            with open(self.output_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(manifest, ensure_ascii=False) + "\n")
+            logging.info(f"Дані збережено у {self.output_path}")
+            return manifest
+        except Exception as e:
+            logging.error(f"Помилка збереження даних: {e}")
+            raise
+
+    def load_data(self) -> Iterator[LazySnapshot]:
+        """Послідовне читання знімків з файлу маніфестів."""
+        with open(self.output_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield self.store.load_snapshot(json.loads(line))
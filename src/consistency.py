@@ -0,0 +1,195 @@
+import logging
+from collections.abc import Iterable, Mapping
+from typing import Any, NamedTuple
+
+from src.peer_index import gateway_address
+from src.utils import INVALID_PREFIX, format_prefix, route_prefix_key
+
+# Види розбіжностей
+MISSING = 'missing'          # префікс відсутній на маршрутизаторі, хоча очікується
+UNEXPECTED = 'unexpected'    # префікс присутній, але не очікується за еталоном
+NEXT_HOP = 'next-hop'        # неочікуваний наступний перехід (або петля між маршрутизаторами)
+
+
+class Inconsistency(NamedTuple):
+    """Розбіжність маршрутної інформації між маршрутизаторами."""
+    kind: str
+    prefix: str
+    router: str
+    detail: str
+
+
+def join_by_prefix(tables: Mapping[str, Mapping[str, Any]]) -> dict[int, dict[str, str]]:
+    """
+    Хеш-з'єднання таблиць маршрутів за префіксом.
+    Args:
+        tables: Знімки (формат BGPParser.get_bgp_data) за назвою маршрутизатора.
+    Returns:
+        dict: ключ префікса (utils.prefix_key) -> {маршрутизатор: адреса шлюзу}; один прохід по всіх маршрутах.
+    """
+    joined: dict[int, dict[str, str]] = {}
+    for router, snapshot in tables.items():
+        for route in snapshot.get('routes', []):
+            key = route_prefix_key(route)
+            if key == INVALID_PREFIX:
+                continue  # некоректні мережі не звіряються між маршрутизаторами
+            joined.setdefault(key, {})[router] = gateway_address(route.get('gateway', ''))
+    return joined
+
+
+def address_owners(tables: Mapping[str, Mapping[str, Any]]) -> dict[str, str]:
+    """Власники адрес: local.address кожної BGP-сесії належить маршрутизатору, з якого її отримано."""
+    owners = {}
+    for router, snapshot in tables.items():
+        for session in snapshot.get('sessions', []):
+            address = gateway_address(session.get('local.address', ''))
+            if address:
+                owners[address] = router
+    return owners
+
+
+def session_peers(tables: Mapping[str, Mapping[str, Any]], owners: Mapping[str, str]) -> dict[str, dict[str, set[str]]]:
+    """Сусіди кожного маршрутизатора серед опитуваних: {маршрутизатор: {сусід: адреси сусіда в сесіях}}."""
+    peers: dict[str, dict[str, set[str]]] = {}
+    for router, snapshot in tables.items():
+        for session in snapshot.get('sessions', []):
+            address = gateway_address(session.get('remote.address', ''))
+            peer = owners.get(address)
+            if peer is not None and peer != router:
+                peers.setdefault(router, {}).setdefault(peer, set()).add(address)
+    return peers
+
+
+def prefix_origins(present: Mapping[str, str], owners: Mapping[str, str]) -> set[str]:
+    """
+    Маршрутизатори, що анонсують префікс: ланцюжок наступних переходів від кожного власника
+    маршруту веде до маршрутизатора, у таблиці BGP якого цього префікса немає (він його джерело).
+    """
+    origins = set()
+    for router in present:
+        seen = {router}
+        owner = owners.get(present[router])
+        while owner is not None and owner in present and owner not in seen:
+            seen.add(owner)
+            owner = owners.get(present[owner])
+        if owner is not None and owner not in present:
+            origins.add(owner)
+    return origins
+
+
+def check_consistency(tables: Mapping[str, Mapping[str, Any]],
+                      expected: Mapping[str, Mapping[str, Any]] | None = None) -> list[Inconsistency]:
+    """
+    Перевірка узгодженості останніх таблиць маршрутів усіх маршрутизаторів за лінійний час.
+    Джерело кожного префікса визначається за наступними переходами інших маршрутизаторів
+    і власниками адрес сесій. Префікс очікується на кожному маршрутизаторі, що має сесію
+    з джерелом, і саме через адресу цієї сесії: маршрути iBGP не переанонсовуються між
+    сусідами, тож маршрутизатори без сесії з джерелом не перевіряються.
+    Args:
+        tables: Останні знімки за назвою маршрутизатора.
+        expected: Еталонні знімки за назвою маршрутизатора (наприклад, з backup_loader.load_etalons
+            або перший повний раунд опитування) для додаткової перевірки кожного маршрутизатора.
+    Returns:
+        list: Знайдені розбіжності.
+    """
+    expected = expected or {}
+    joined = join_by_prefix(tables)
+    owners = address_owners(tables)
+    peers = session_peers(tables, owners)
+    wanted = join_by_prefix({router: expected[router] for router in tables if router in expected})
+
+    issues = []
+    for key in joined.keys() | wanted.keys():
+        present = joined.get(key, {})
+        want = wanted.get(key, {})
+        found: dict[tuple[str, str], Inconsistency] = {}
+
+        # Звірка маршрутизаторів між собою: сусіди джерела мають отримувати префікс від нього
+        origins = prefix_origins(present, owners)
+        for router in tables:
+            addresses = set().union(*(peers.get(router, {}).get(origin, set()) for origin in origins - {router}))
+            if not addresses or router in origins:
+                continue
+            source = ", ".join(sorted(origins))
+            if router not in present:
+                found[MISSING, router] = Inconsistency(MISSING, format_prefix(key), router,
+                                                       f"анонсує {source}, очікується через {', '.join(sorted(addresses))}")
+            elif present[router] not in addresses:
+                found[NEXT_HOP, router] = Inconsistency(NEXT_HOP, format_prefix(key), router,
+                                                        f"через {present[router]}, анонсує {source} "
+                                                        f"(очікується {', '.join(sorted(addresses))})")
+
+        # Додаткова звірка з еталоном кожного маршрутизатора
+        for router in tables:
+            if router not in expected:
+                continue
+            if router in want and router not in present:
+                issue = Inconsistency(MISSING, format_prefix(key), router, f"очікується через {want[router]}")
+            elif router in present and router not in want:
+                issue = Inconsistency(UNEXPECTED, format_prefix(key), router, f"через {present[router]}")
+            elif router in present and present[router] != want[router]:
+                issue = Inconsistency(NEXT_HOP, format_prefix(key), router,
+                                      f"через {present[router]}, очікується {want[router]}")
+            else:
+                continue
+            found.setdefault((issue.kind, router), issue)
+
+        # Петля: наступний перехід веде до маршрутизатора, який сам спрямовує префікс назад
+        for router, gateway in present.items():
+            owner = owners.get(gateway)
+            if owner is not None and owner in present and owners.get(present[owner]) == router:
+                found[NEXT_HOP, router] = Inconsistency(NEXT_HOP, format_prefix(key), router,
+                                                        f"петля через {gateway} ({owner})")
+        issues.extend(found.values())
+    return issues
+
+
+class ConsistencyMonitor:
+    """
+    Клас кореляції останніх знімків кількох маршрутизаторів. Знімки передають спостерігачі
+    після кожного опитування (без повторного запиту); перевірка виконується, коли оновились
+    усі маршрутизатори, а повідомляються лише нові та усунені розбіжності. Якщо еталони
+    не задано, очікуваним станом стає перший повний раунд опитування.
+    """
+    def __init__(self, routers: Iterable[str], expected: Mapping[str, Mapping[str, Any]] | None = None):
+        self.routers = set(routers)
+        self.expected = dict(expected) if expected else None
+        self.snapshots: dict[str, Mapping[str, Any]] = {}
+        self.pending = set(self.routers)
+        self.reported: set[Inconsistency] = set()
+
+    def update(self, router: str, snapshot: Mapping[str, Any]) -> tuple[list[Inconsistency], list[Inconsistency]] | None:
+        """
+        Облік нового знімка маршрутизатора.
+        Returns:
+            tuple | None: (нові, усунені) розбіжності або None, якщо раунд опитування ще не завершено.
+        """
+        self.snapshots[router] = snapshot
+        self.pending.discard(router)
+        return self._check()
+
+    def remove(self, router: str) -> tuple[list[Inconsistency], list[Inconsistency]] | None:
+        """
+        Виключення маршрутизатора, спостерігач якого завершився з помилкою, щоб раунди
+        решти маршрутизаторів не очікували його знімка.
+        """
+        self.routers.discard(router)
+        self.pending.discard(router)
+        self.snapshots.pop(router, None)
+        logging.warning(f"Маршрутизатор {router} виключено зі звірки таблиць, залишилось: {len(self.routers)}")
+        self.reported = {issue for issue in self.reported if issue.router != router}
+        return self._check() if self.snapshots else None
+
+    def _check(self) -> tuple[list[Inconsistency], list[Inconsistency]] | None:
+        if self.pending:
+            return None
+        self.pending = set(self.routers)
+
+        if self.expected is None:
+            self.expected = dict(self.snapshots)
+            logging.info(f"Перший раунд опитування прийнято за еталон звірки таблиць ({len(self.expected)} маршрутизаторів)")
+
+        current = set(check_consistency(self.snapshots, self.expected))
+        new, resolved = sorted(current - self.reported), sorted(self.reported - current)
+        self.reported = current
+        return new, resolved
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+from aiohttp import web
+
+from config import CHART_TIME_FORMAT
+from src.downsample import min_max_indices
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), 'static')
+
+
+def sse_message(event: str, payload: dict) -> bytes:
+    """Серіалізація події у формат Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8')
+
+
+class EventHub:
+    """Клас для розсилки оновлень моніторингу довільній кількості клієнтів."""
+    def __init__(self, history_size: int = 86400, backfill_points: int = 500, queue_size: int = 256):
+        self.history_size = history_size
+        self.backfill_points = backfill_points
+        self.queue_size = queue_size
+        self.scores: dict[str, deque[tuple[float, float, float]]] = {}
+        self.counters: dict[str, dict[str, int]] = {}
+        self.metrics: dict[str, dict] = {}
+        self.alerts: deque[dict] = deque(maxlen=100)
+        self.clients: set[asyncio.Queue] = set()
+        self._backfill: bytes | None = None
+
+    def subscribe(self) -> tuple[asyncio.Queue, bytes]:
+        """Реєстрація клієнта; повертає чергу оновлень і стислу історію для початкового заповнення."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.clients.add(queue)
+        return queue, self.backfill()
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.clients.discard(queue)
+
+    def close(self) -> None:
+        """Завершення трансляції для всіх підключених клієнтів."""
+        for queue in list(self.clients):
+            self.unsubscribe(queue)
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def publish_scores(self, router: str, etalon_score: float, previous_score: float) -> None:
+        """Публікація оцінок, що записуються у ChartStorage."""
+        now = datetime.now()
+        history = self.scores.setdefault(router, deque(maxlen=self.history_size))
+        history.append((now.timestamp(), etalon_score, previous_score))
+        self._broadcast(sse_message('scores', {
+            'router': router,
+            'timestamp': now.strftime(CHART_TIME_FORMAT),
+            'time': now.timestamp(),
+            'etalon': etalon_score,
+            'previous': previous_score,
+        }))
+
+    def publish_counters(self, router: str, counters: dict[str, int]) -> None:
+        """Публікація лічильників виявлених проблем."""
+        self.counters[router] = dict(counters)
+        self._broadcast(sse_message('counters', {'router': router, 'counters': self.counters[router]}))
+
+    def publish_metrics(self, router: str, metrics: dict) -> None:
+        """Публікація додаткових метрик аналізу (наприклад, флапінгу маршрутів)."""
+        if self.metrics.get(router) == metrics:
+            return
+        self.metrics[router] = metrics
+        self._broadcast(sse_message('metrics', {'router': router, 'metrics': metrics}))
+
+    def publish_alert(self, router: str, severity: str, title: str, message: str) -> None:
+        """Публікація події тривоги."""
+        alert = {
+            'router': router,
+            'timestamp': datetime.now().strftime(CHART_TIME_FORMAT),
+            'severity': severity,
+            'title': title,
+            'message': message,
+        }
+        self.alerts.append(alert)
+        self._broadcast(sse_message('alert', alert))
+
+    def backfill(self) -> bytes:
+        """Стисла історія для нового клієнта; обчислюється один раз до появи нових даних."""
+        if self._backfill is None:
+            routers = {}
+            for router, history in self.scores.items():
+                data = np.array(history, dtype=float).reshape(-1, 3)
+                # Спільна вибірка для обох рядів, щоб клієнт отримав узгоджені точки
+                keep = np.union1d(
+                    min_max_indices(data[:, 1], self.backfill_points // 2),
+                    min_max_indices(data[:, 2], self.backfill_points // 2),
+                )
+                routers[router] = {
+                    'time': data[keep, 0].tolist(),
+                    'etalon': data[keep, 1].tolist(),
+                    'previous': data[keep, 2].tolist(),
+                }
+            self._backfill = sse_message('backfill', {
+                'routers': routers,
+                'counters': self.counters,
+                'metrics': self.metrics,
+                'alerts': list(self.alerts),
+            })
+        return self._backfill
+
+    def _broadcast(self, message: bytes) -> None:
+        self._backfill = None
+        for queue in list(self.clients):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Повільний клієнт: відключаємо, після перепідключення він отримає backfill
+                logging.warning("Клієнт панелі моніторингу не встигає отримувати оновлення, відключення")
+                self.unsubscribe(queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+
+class DashboardServer:
+    """Клас HTTP-сервера панелі моніторингу з трансляцією подій через Server-Sent Events."""
+    def __init__(self, hub: EventHub, host: str = '127.0.0.1', port: int = 8080):
+        self.hub = hub
+        self.host = host
+        self.port = port
+        self.runner: web.AppRunner | None = None
+
+        self.app = web.Application()
+        self.app.router.add_get('/', self.index)
+        self.app.router.add_get('/events', self.events)
+
+    async def start(self) -> None:
+        """Запуск сервера у поточному циклі подій."""
+        try:
+            self.runner = web.AppRunner(self.app)
+            await self.runner.setup()
+            await web.TCPSite(self.runner, self.host, self.port).start()
+            logging.info(f"Панель моніторингу доступна за адресою http://{self.host}:{self.port}/")
+        except Exception as e:
+            logging.error(f"Помилка запуску панелі моніторингу: {e}")
+            raise
+
+    async def stop(self) -> None:
+        self.hub.close()
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def index(self, request: web.Request) -> web.FileResponse:
+        return web.FileResponse(os.path.join(STATIC_DIR, 'dashboard.html'))
+
+    async def events(self, request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'Connection': 'keep-alive',
+        })
+        await response.prepare(request)
+
+        queue, backfill = self.hub.subscribe()
+        try:
+            await response.write(backfill)
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                await response.write(message)
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            self.hub.unsubscribe(queue)
+        return response
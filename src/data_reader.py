@@ -1,5 +1,8 @@
 import threading
 import time
+from datetime import datetime
+
+from config import CHART_TIME_FORMAT
 
 class DataReader(threading.Thread):
     def __init__(self, filename, interval=5):
@@ -29,8 +32,7 @@ class DataReader(threading.Thread):
                     if len(parts) >= 3:
                         try:
                             timestamp_str = parts[0].strip()
-                            # dt_object = datetime.strptime(timestamp_str, CHART_TIME_FORMAT)
-                            dt_object = timestamp_str
+                            dt_object = datetime.strptime(timestamp_str, CHART_TIME_FORMAT)
 
                             val1 = float(parts[1].strip())
                             val2 = float(parts[2].strip())
@@ -56,10 +58,9 @@ class DataReader(threading.Thread):
         self.running = False
         print("Потік зчитувача даних сигналізував про зупинку.")
 
-    def get_data(self):
+    def drain(self):
+        """Повертає нові точки та видаляє їх із буфера зчитувача (курсор читання лише рухається вперед)."""
         with self.lock:
-            return {
-                'timestamps': list(self.data_points['timestamps']),
-                'values1': list(self.data_points['values1']),
-                'values2': list(self.data_points['values2'])
-            }
+            data = self.data_points
+            self.data_points = {'timestamps': [], 'values1': [], 'values2': []}
+        return data
@@ -0,0 +1,97 @@
+import numpy as np
+
+
+def min_max_indices(y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """
+    Індекси точок, що залишаються після проріджування за методом min/max: у кожному
+    з n_buckets інтервалів зберігаються точки з мінімальним та максимальним значенням.
+    Args:
+        y: Масив значень.
+        n_buckets: Кількість інтервалів (зазвичай ширина області графіка у пікселях).
+    Returns:
+        np.ndarray: Відсортовані індекси (не більше 2 * n_buckets + 2).
+    """
+    size = len(y)
+    if n_buckets <= 0 or size <= 2 * n_buckets:
+        return np.arange(size)
+
+    # Відкидаємо хвіст, що не ділиться націло, та обробляємо його окремим інтервалом
+    bucket_size = size // n_buckets
+    body = bucket_size * n_buckets
+    blocks = y[:body].reshape(n_buckets, bucket_size)
+    offsets = np.arange(n_buckets) * bucket_size
+
+    min_idx = blocks.argmin(axis=1) + offsets
+    max_idx = blocks.argmax(axis=1) + offsets
+    indices = np.sort(np.concatenate((min_idx, max_idx)))
+
+    if body < size:
+        tail = y[body:]
+        indices = np.concatenate((indices, np.unique([body + tail.argmin(), body + tail.argmax()])))
+
+    return indices
+
+
+def min_max_downsample(x: np.ndarray, y: np.ndarray, n_buckets: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Проріджування ряду за методом min/max із збереженням порядку точок.
+    Args:
+        x: Відсортований масив часових позначок.
+        y: Масив значень тієї ж довжини.
+        n_buckets: Кількість інтервалів.
+    Returns:
+        tuple: Проріджені масиви x та y.
+    """
+    if n_buckets <= 0 or len(x) <= 2 * n_buckets:
+        return x, y
+    indices = min_max_indices(y, n_buckets)
+    return x[indices], y[indices]
+
+
+def lttb_downsample(x: np.ndarray, y: np.ndarray, n_out: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Проріджування ряду алгоритмом Largest-Triangle-Three-Buckets (LTTB).
+    Args:
+        x: Відсортований масив часових позначок.
+        y: Масив значень тієї ж довжини.
+        n_out: Кількість точок у результаті (включно з першою та останньою).
+    Returns:
+        tuple: Проріджені масиви x та y.
+    """
+    size = len(x)
+    if n_out < 3 or size <= n_out:
+        return x, y
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, size - 1
+
+    # Межі інтервалів для внутрішніх точок (перша та остання точки фіксовані)
+    edges = np.linspace(1, size - 1, n_out - 1).astype(np.int64)
+
+    selected = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else size
+        if next_end <= next_start:
+            next_end = next_start + 1
+
+        # Вершина трикутника у наступному інтервалі — середня точка
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        areas = np.abs(
+            (x[selected] - avg_x) * (bucket_y - y[selected])
+            - (x[selected] - bucket_x) * (avg_y - y[selected])
+        )
+        selected = start + int(areas.argmax())
+        indices[i + 1] = selected
+
+    return x[indices], y[indices]
+
+
+DOWNSAMPLERS = {
+    'minmax': lambda x, y, width: min_max_downsample(x, y, width),
+    'lttb': lambda x, y, width: lttb_downsample(x, y, 2 * width),
+}
@@ -0,0 +1,130 @@
+import random
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+# Індекси полів запису префікса (список замість об'єкта — менше пам'яті та швидший доступ)
+PENALTY, UPDATED, SUPPRESSED = 0, 1, 2
+
+
+class FlapTracker:
+    """
+    Клас обліку флапінгу маршрутів зі штрафами, що експоненційно згасають (за RFC 2439).
+    Кожна зміна префікса додає штраф; при перевищенні порогу suppress префікс вважається
+    пригніченим до зниження штрафу нижче порогу reuse. Записи, штраф яких згас нижче
+    порогу forget, видаляються, а загальна кількість записів обмежена max_entries.
+    """
+    def __init__(self,
+                 half_life: float = 900.0, penalty: float = 1000.0,
+                 suppress: float = 2000.0, reuse: float = 750.0, max_penalty: float = 12000.0,
+                 forget: float | None = None, max_entries: int = 100000):
+        if not reuse < suppress <= max_penalty:
+            raise ValueError("Пороги мають задовольняти reuse < suppress <= max-penalty")
+
+        self.half_life = half_life
+        self.flap_penalty = penalty
+        self.suppress = suppress
+        self.reuse = reuse
+        self.max_penalty = max_penalty
+        self.forget = reuse / 2 if forget is None else forget
+        self.max_entries = max_entries
+        self.entries: OrderedDict[Hashable, list] = OrderedDict()
+
+    def _decayed(self, entry: list, now: float) -> float:
+        return entry[PENALTY] * 2.0 ** ((entry[UPDATED] - now) / self.half_life)
+
+    def record(self, key: Hashable, now: float | None = None) -> float:
+        """
+        Облік однієї зміни (появи, зникнення або заміни) префікса за амортизований O(1).
+        Args:
+            key: Префікс або інший ключ маршруту.
+            now: Час події у секундах (за замовчуванням time.monotonic()).
+        Returns:
+            float: Поточний штраф префікса.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = [self.flap_penalty, now, False]
+        else:
+            entry[PENALTY] = min(self._decayed(entry, now) + self.flap_penalty, self.max_penalty)
+            entry[UPDATED] = now
+            self.entries.move_to_end(key)
+
+        if entry[PENALTY] >= self.suppress:
+            entry[SUPPRESSED] = True
+        elif entry[SUPPRESSED] and entry[PENALTY] < self.reuse:
+            entry[SUPPRESSED] = False
+
+        self._evict(now)
+        return entry[PENALTY]
+
+    def _evict(self, now: float) -> None:
+        # Найдавніше оновлені записи — на початку; видаляємо згаслі та надлишкові
+        entries = self.entries
+        while entries:
+            key, entry = next(iter(entries.items()))
+            if len(entries) <= self.max_entries and self._decayed(entry, now) >= self.forget:
+                break
+            entries.popitem(last=False)
+
+    def penalty(self, key: Hashable, now: float | None = None) -> float:
+        """Поточний (згаслий) штраф префікса."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return 0.0
+        return self._decayed(entry, time.monotonic() if now is None else now)
+
+    def is_suppressed(self, key: Hashable, now: float | None = None) -> bool:
+        """Чи пригнічено префікс; знімає пригнічення після зниження штрафу нижче reuse."""
+        entry = self.entries.get(key)
+        if entry is None or not entry[SUPPRESSED]:
+            return False
+        if self._decayed(entry, time.monotonic() if now is None else now) < self.reuse:
+            entry[SUPPRESSED] = False
+        return entry[SUPPRESSED]
+
+    def stats(self, now: float | None = None) -> dict[str, float]:
+        """Метрики для журналу та панелі моніторингу (обхід усіх записів, викликається раз за опитування)."""
+        if now is None:
+            now = time.monotonic()
+        suppressed, max_penalty = 0, 0.0
+        for key in self.entries:
+            if self.is_suppressed(key, now):
+                suppressed += 1
+            max_penalty = max(max_penalty, self._decayed(self.entries[key], now))
+        return {
+            'tracked': len(self.entries),
+            'suppressed': suppressed,
+            'max-penalty': round(max_penalty, 1),
+        }
+
+
+def benchmark(events: int = 1000000, prefixes: int = 200000) -> float:
+    """
+    Вимірювання пропускної здатності FlapTracker.record.
+    Args:
+        events: Кількість подій змін.
+        prefixes: Кількість різних префіксів, серед яких обираються події.
+    Returns:
+        float: Подій за секунду.
+    """
+    tracker = FlapTracker(max_entries=prefixes // 2)
+    keys = [f"10.{i >> 16 & 0xFF}.{i >> 8 & 0xFF}.{i & 0xFF}/32" for i in range(prefixes)]
+    stream = [keys[random.randrange(prefixes)] for _ in range(events)]
+    record = tracker.record
+
+    started = time.perf_counter()
+    for i, key in enumerate(stream):
+        record(key, i * 0.001)
+    elapsed = time.perf_counter() - started
+
+    rate = events / elapsed
+    print(f"FlapTracker: {events} подій за {elapsed:.2f} с, {rate:,.0f} подій/с, записів: {len(tracker.entries)}")
+    return rate
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -2,18 +2,61 @@ import logging
 import os
 from datetime import datetime
 
+from src.segment_log import SegmentWriter
 
-def setup_logging():
+
+class CompressedLogHandler(logging.Handler):
+    """Обробник журналу із записом у стиснені сегменти gzip з ротацією за розміром і часом."""
+    def __init__(self, filename: str, max_bytes: int = 16 * 1024 * 1024, max_seconds: float = 3600.0,
+                 block_bytes: int = 64 * 1024, flush_seconds: float = 5.0):
+        super().__init__()
+        self.writer = SegmentWriter(filename, max_bytes=max_bytes, max_seconds=max_seconds,
+                                    block_bytes=block_bytes, flush_seconds=flush_seconds)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record) + "\n"
+            with self.lock:
+                self.writer.write(line.encode('utf-8'), record.created)
+                # Помилки та тривоги не повинні залишатися в буфері блоку
+                if record.levelno >= logging.ERROR:
+                    self.writer.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        with self.lock:
+            self.writer.flush()
+
+    def close(self) -> None:
+        with self.lock:
+            self.writer.close()
+        super().close()
+
+
+def setup_logging(log_config: dict | None = None):
     """Налаштування логування."""
+    log_config = log_config or {}
     log_dir = 'logs'
     os.makedirs(log_dir, exist_ok=True)
     now = datetime.now()
+    filename = os.path.join(log_dir, '{0}_{1}_events.log'.format(now.strftime("%Y%m%d"), now.strftime("%H%M%S")))
+
+    if log_config.get('compress', False):
+        file_handler = CompressedLogHandler(
+            filename,
+            max_bytes=int(log_config.get('rotate-bytes', 16 * 1024 * 1024)),
+            max_seconds=float(log_config.get('rotate-seconds', 3600)),
+            block_bytes=int(log_config.get('block-bytes', 64 * 1024)),
+        )
+    else:
+        file_handler = logging.FileHandler(filename)
 
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(message)s',
         handlers=[
-            logging.FileHandler(os.path.join(log_dir, '{0}_{1}_events.log'.format(now.strftime("%Y%m%d"), now.strftime("%H%M%S")))),
+            file_handler,
             logging.StreamHandler()
         ]
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,90 @@
+from typing import Iterable, NamedTuple
+
+from src.utils import route_prefix_key
+
+
+class PeerChange(NamedTuple):
+    """Зміни маршрутів одного сусіда BGP за інтервал опитування."""
+    peer: str
+    gateway: str
+    lost: frozenset[int]       # ключі префіксів (utils.prefix_key)
+    gained: frozenset[int]
+    withdrawn: bool
+
+
+def gateway_address(gateway: str) -> str:
+    """Адреса шлюзу без інтерфейсу та довжини префікса (10.0.14.1%ether1, 10.0.14.1/32 -> 10.0.14.1)."""
+    return gateway.split('%')[0].split('/')[0]
+
+
+class PeerRouteIndex:
+    """Клас індексу маршрутів за сусідами BGP, що оновлюється інкрементально за різницями."""
+    def __init__(self, sessions: list[dict[str, str]] | None = None, routes: list[dict[str, str]] | None = None):
+        self.peers: dict[str, str] = {}
+        self.index: dict[str, set[int]] = {}
+        if sessions:
+            self.update_sessions(sessions)
+        if routes:
+            self.rebuild(routes)
+
+    def update_sessions(self, sessions: list[dict[str, str]]) -> None:
+        """Зв'язок адреси сусіда (remote.address) з назвою сесії."""
+        for session in sessions:
+            address = gateway_address(session.get('remote.address', ''))
+            if address:
+                self.peers[address] = session.get('name', '') or address
+
+    def peer_name(self, gateway: str) -> str:
+        return self.peers.get(gateway, gateway)
+
+    def rebuild(self, routes: list[dict[str, str]]) -> None:
+        """Повна побудова індексу з таблиці маршрутів."""
+        self.index = {}
+        for route in routes:
+            self.index.setdefault(gateway_address(route.get('gateway', '')), set()).add(route_prefix_key(route))
+
+    def prefixes(self, gateway: str) -> set[int]:
+        return self.index.get(gateway_address(gateway), set())
+
+    def apply(self, added: Iterable[dict[str, str]], removed: Iterable[dict[str, str]]) -> list[PeerChange]:
+        """
+        Інкрементальне оновлення індексу за різницею таблиць маршрутів.
+        Args:
+            added: Маршрути, що з'явились.
+            removed: Маршрути, що зникли.
+        Returns:
+            list: Зміни для кожного сусіда, якого стосується різниця; час роботи
+            пропорційний кількості змінених маршрутів, а не розміру таблиці.
+        """
+        lost: dict[str, set[int]] = {}
+        gained: dict[str, set[int]] = {}
+
+        for route in removed:
+            gateway = gateway_address(route.get('gateway', ''))
+            prefix = route_prefix_key(route)
+            prefixes = self.index.get(gateway)
+            if prefixes is not None and prefix in prefixes:
+                prefixes.discard(prefix)
+                lost.setdefault(gateway, set()).add(prefix)
+
+        for route in added:
+            gateway = gateway_address(route.get('gateway', ''))
+            prefix = route_prefix_key(route)
+            prefixes = self.index.setdefault(gateway, set())
+            if prefix not in prefixes:
+                prefixes.add(prefix)
+                gained.setdefault(gateway, set()).add(prefix)
+
+        changes = []
+        for gateway in lost.keys() | gained.keys():
+            withdrawn = bool(lost.get(gateway)) and not self.index.get(gateway)
+            if withdrawn:
+                del self.index[gateway]
+            changes.append(PeerChange(
+                peer=self.peer_name(gateway),
+                gateway=gateway,
+                lost=frozenset(lost.get(gateway, ())),
+                gained=frozenset(gained.get(gateway, ())),
+                withdrawn=withdrawn,
+            ))
+        return changes
@@ -0,0 +1,214 @@
+import bisect
+import glob
+import gzip
+import logging
+import os
+import struct
+import time
+import zlib
+from typing import Iterator, NamedTuple
+
+# Формат сегмента — звичайний багатоелементний gzip (читається gzip.open або zcat):
+#   [елемент даних]... [елемент індексу] [завершальний елемент]
+# Елементи індексу та завершальний мають порожній вміст, а дані зберігають у полі FEXTRA
+# заголовка, тому zcat виводить лише записи. Завершальний елемент має фіксований розмір
+# і містить зміщення елемента індексу.
+GZIP_FEXTRA = 0x04
+INDEX_FIELD = b'BI'
+TRAILER_FIELD = b'BT'
+INDEX_ENTRY = struct.Struct('<IId')      # зміщення елемента, номер першого запису, час першого запису
+TRAILER = struct.Struct('<QI')           # зміщення елемента індексу, кількість записів у сегменті
+MAX_INDEX_ENTRIES = (0xFFFF - 4) // INDEX_ENTRY.size
+MAX_SEGMENT_BYTES = 0xFFFFFFFF
+
+
+class IndexEntry(NamedTuple):
+    """Запис індексу сегмента: початок елемента gzip та перший запис у ньому."""
+    offset: int
+    record: int
+    timestamp: float
+
+
+def gzip_member(payload: bytes, extra: bytes = b'', level: int = 6) -> bytes:
+    """Один незалежний елемент gzip (RFC 1952) з необов'язковим полем FEXTRA."""
+    header = struct.pack('<BBBBIBB', 0x1F, 0x8B, 8, GZIP_FEXTRA if extra else 0, 0, 0, 255)
+    if extra:
+        header += struct.pack('<H', len(extra)) + extra
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    body = compressor.compress(payload) + compressor.flush()
+    return header + body + struct.pack('<II', zlib.crc32(payload), len(payload) & 0xFFFFFFFF)
+
+
+def extra_field(name: bytes, data: bytes) -> bytes:
+    return name + struct.pack('<H', len(data)) + data
+
+
+TRAILER_SIZE = len(gzip_member(b'', extra_field(TRAILER_FIELD, TRAILER.pack(0, 0))))
+
+
+def member_extra(member: bytes) -> dict[bytes, bytes]:
+    """Підполя FEXTRA із заголовка елемента gzip."""
+    if len(member) < 12 or member[:2] != b'\x1f\x8b' or not member[3] & GZIP_FEXTRA:
+        return {}
+    (length,) = struct.unpack_from('<H', member, 10)
+    extra, fields, pos = member[12:12 + length], {}, 0
+    while pos + 4 <= len(extra):
+        name, (size,) = extra[pos:pos + 2], struct.unpack_from('<H', extra, pos + 2)
+        fields[name] = extra[pos + 4:pos + 4 + size]
+        pos += 4 + size
+    return fields
+
+
+class SegmentWriter:
+    """
+    Клас потокового запису стиснених сегментів з ротацією за розміром і часом.
+    Записи групуються в блоки по block_bytes; кожен блок — окремий елемент gzip,
+    тому будь-який сегмент розпаковується незалежно, а з індексу можна почати читання
+    з потрібного блоку без розпакування попередніх.
+    """
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, max_seconds: float = 3600.0,
+                 block_bytes: int = 0, flush_seconds: float = 5.0, level: int = 6):
+        self.path = path
+        self.max_bytes = min(max_bytes, MAX_SEGMENT_BYTES)
+        self.max_seconds = max_seconds
+        self.block_bytes = block_bytes
+        self.flush_seconds = flush_seconds
+        self.level = level
+
+        self.file = None
+        self.segment = len(segment_paths(path))
+        self.opened = 0.0
+        self.index: list[IndexEntry] = []
+        self.records = 0
+        self.block: list[bytes] = []
+        self.block_size = 0
+        self.block_started = 0.0
+        self.block_timestamp = 0.0
+
+    def segment_path(self, number: int) -> str:
+        # Номер сегмента додається після повного імені, тож шаблон "<path>*" охоплює і сегменти
+        return f"{self.path}.{number:04d}.gz"
+
+    def _open(self) -> None:
+        path = self.segment_path(self.segment)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'wb')
+        self.opened = time.monotonic()
+        self.index = []
+        self.records = 0
+
+    def write(self, record: bytes, timestamp: float | None = None) -> None:
+        """Додавання одного запису (рядка) до поточного блоку."""
+        if not self.block:
+            self.block_started = time.monotonic()
+            self.block_timestamp = time.time() if timestamp is None else timestamp
+        self.block.append(record)
+        self.block_size += len(record)
+        if self.block_size >= self.block_bytes or time.monotonic() - self.block_started >= self.flush_seconds:
+            self.flush()
+
+    def flush(self) -> None:
+        """Запис накопиченого блоку окремим елементом gzip і, за потреби, ротація сегмента."""
+        if not self.block:
+            return
+        if self.file is None:
+            self._open()
+        self.index.append(IndexEntry(self.file.tell(), self.records, self.block_timestamp))
+        self.file.write(gzip_member(b''.join(self.block), level=self.level))
+        self.file.flush()
+        self.records += len(self.block)
+        self.block, self.block_size = [], 0
+
+        if (self.file.tell() >= self.max_bytes or time.monotonic() - self.opened >= self.max_seconds
+                or len(self.index) >= MAX_INDEX_ENTRIES):
+            self._close_segment()
+
+    def _close_segment(self) -> None:
+        if self.file is None:
+            return
+        index_offset = self.file.tell()
+        entries = b''.join(INDEX_ENTRY.pack(*entry) for entry in self.index)
+        self.file.write(gzip_member(b'', extra_field(INDEX_FIELD, entries)))
+        self.file.write(gzip_member(b'', extra_field(TRAILER_FIELD, TRAILER.pack(index_offset, self.records))))
+        self.file.close()
+        self.file = None
+        self.segment += 1
+
+    def close(self) -> None:
+        self.flush()
+        self._close_segment()
+
+
+def segment_paths(path: str) -> list[str]:
+    """Сегменти файлу path у порядку запису."""
+    return sorted(glob.glob(f"{glob.escape(path)}.[0-9][0-9][0-9][0-9].gz"))
+
+
+def read_index(segment: str) -> list[IndexEntry]:
+    """
+    Індекс сегмента із завершального елемента. Для незакритого сегмента (поточного
+    або після аварійного завершення) індекс відновлюється проходом по елементах gzip.
+    """
+    with open(segment, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size >= TRAILER_SIZE:
+            f.seek(size - TRAILER_SIZE)
+            trailer = member_extra(f.read(TRAILER_SIZE)).get(TRAILER_FIELD)
+            if trailer and len(trailer) == TRAILER.size:
+                index_offset, _ = TRAILER.unpack(trailer)
+                f.seek(index_offset)
+                entries = member_extra(f.read(size - TRAILER_SIZE - index_offset)).get(INDEX_FIELD, b'')
+                return [IndexEntry(*fields) for fields in INDEX_ENTRY.iter_unpack(entries)]
+
+        f.seek(0)
+        data = f.read()
+    index, offset, record = [], 0, 0
+    while offset < len(data):
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        try:
+            payload = decompressor.decompress(data[offset:])
+        except zlib.error:
+            break  # обірваний останній елемент
+        if not decompressor.eof:
+            break
+        if payload:
+            index.append(IndexEntry(offset, record, float('nan')))
+            record += payload.count(b'\n')
+        offset = len(data) - len(decompressor.unused_data)
+    return index
+
+
+def read_records(path: str, since: float | None = None) -> Iterator[bytes]:
+    """
+    Послідовне читання записів усіх сегментів файлу path.
+    Args:
+        path: Базовий шлях, з яким створювався SegmentWriter.
+        since: Час (time.time()), з якого потрібні записи; сегменти та блоки, що повністю
+            передують йому, пропускаються за індексом без розпакування (читання починається
+            з блоку, який містить since).
+    """
+    segments = [(segment, 0) for segment in segment_paths(path)]
+    if since is not None:
+        start = []
+        for segment, _ in segments:
+            index = [entry for entry in read_index(segment) if entry.timestamp == entry.timestamp]
+            position = bisect.bisect_right([entry.timestamp for entry in index], since) - 1
+            if position >= 0:
+                start = []  # попередні сегменти повністю передують since
+            start.append((segment, index[position].offset if position >= 0 else 0))
+        segments = start
+
+    for segment, offset in segments:
+        yield from read_segment(segment, offset)
+
+
+def read_segment(segment: str, offset: int = 0) -> Iterator[bytes]:
+    """Записи одного сегмента, починаючи з елемента gzip за зміщенням offset."""
+    try:
+        with open(segment, 'rb') as f:
+            f.seek(offset)
+            with gzip.GzipFile(fileobj=f) as stream:
+                yield from stream
+    except EOFError:
+        # Останній сегмент може бути записаний не повністю
+        logging.warning(f"Сегмент {segment} обірвано, прочитано наявні записи")
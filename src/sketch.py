@@ -0,0 +1,408 @@
+import argparse
+import base64
+import hashlib
+import random
+import struct
+import time
+import zlib
+from collections.abc import Iterable, Mapping
+from typing import Any, NamedTuple
+
+from src.peer_index import gateway_address
+from src.utils import INVALID_PREFIX, format_prefix, prefix_key, route_prefix_key
+
+# Елемент множини — нормалізований кортеж маршруту (префікс, шлюз, відстань), упакований
+# у ціле число: ключ префікса (137 біт) | ключ шлюзу (137 біт) | відстань (8 біт).
+# Шлюз нормалізується gateway_address (без %інтерфейсу); шлюзи, що не є IP-адресами (назви
+# інтерфейсів), і некоректні мережі кодуються 128-бітним хешем тексту з довжиною NAME_KEY
+# поза простором ключів.
+ELEMENT_BYTES = 36
+PREFIX_SHIFT = 145
+KEY_MASK = (1 << 137) - 1
+NAME_KEY = 0xFF
+
+HASHES = 3            # кількість комірок на елемент (по одній у кожній частині таблиці)
+CELLS = 120           # комірок IBLT: декодується різниця приблизно до CELLS / 1.5 елементів (зміна маршруту — 2 елементи)
+STRATA = 12           # страт оцінювача розміру різниці
+STRATA_CELLS = 24     # комірок у кожній страті
+
+IBLT_CELL = struct.Struct('<i36sQ')
+STRATA_CELL = struct.Struct('<iQI')
+HEADER = struct.Struct('<4sBHBH')
+MAGIC = b'RTSK'
+VERSION = 2
+
+
+class SketchDiff(NamedTuple):
+    """Результат порівняння двох таблиць за ескізами."""
+    size: int                          # розмір симетричної різниці (точний, якщо decoded)
+    decoded: bool                      # чи вдалося відновити всі відмінні маршрути
+    added: list[dict[str, str]]        # маршрути, присутні лише у правій таблиці
+    removed: list[dict[str, str]]      # маршрути, присутні лише у лівій таблиці
+
+
+def name_key(text: str) -> int:
+    digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    return (int.from_bytes(digest, 'big') << 8) | NAME_KEY
+
+
+def gateway_element(gateway: str) -> int:
+    """Ключ шлюзу в елементі: ключ адреси, хеш назви інтерфейсу або 0 для порожнього шлюзу."""
+    address = gateway_address(gateway)
+    if not address:
+        return 0
+    try:
+        return prefix_key(address)
+    except ValueError:
+        return name_key(address)
+
+
+def route_element(route: Mapping[str, Any]) -> int:
+    """
+    Упакований елемент маршруту для ескізу. Це й ключ ідентичності маршруту для
+    utils.route_diff(..., key=route_element), щоб оновлення ескізу за різницею давало
+    той самий ескіз, що й повна перебудова.
+    """
+    gateway = gateway_element(str(route.get('gateway', '')))
+    prefix = route_prefix_key(route)
+    if prefix == INVALID_PREFIX:
+        prefix = name_key(str(route.get('dst-address', '')))
+    distance = int(route.get('distance') or 0) & 0xFF
+    return (prefix << PREFIX_SHIFT) | (gateway << 8) | distance
+
+
+def element_route(element: int) -> dict[str, str]:
+    """Відновлення нормалізованого маршруту з елемента."""
+    prefix, gateway = element >> PREFIX_SHIFT, (element >> 8) & KEY_MASK
+    return {
+        'dst-address': format_prefix(prefix if prefix & 0xFF != NAME_KEY else INVALID_PREFIX),
+        'gateway': format_prefix(gateway).rpartition('/')[0] if gateway and gateway & 0xFF != NAME_KEY else '',
+        'distance': str(element & 0xFF),
+    }
+
+
+def element_digest(element: int) -> bytes:
+    return hashlib.blake2b(element.to_bytes(ELEMENT_BYTES, 'big'), digest_size=32).digest()
+
+
+def token_check(token: int) -> int:
+    """Контрольна сума 64-бітного токена страти (завершальне перемішування splitmix64)."""
+    token = (token ^ (token >> 30)) * 0xBF58476D1CE4E5B9 & 0xFFFFFFFFFFFFFFFF
+    token = (token ^ (token >> 27)) * 0x94D049BB133111EB & 0xFFFFFFFFFFFFFFFF
+    return (token ^ (token >> 31)) & 0xFFFFFFFF
+
+
+class TableSketch:
+    """
+    Клас ескізу таблиці маршрутів: обертана таблиця пошуку Блума (IBLT) для відновлення
+    невеликих різниць і стратифікований оцінювач розміру різниці для великих.
+    Ескізи однакових параметрів можна віднімати (порівняння) та додавати (об'єднання).
+    """
+    def __init__(self, cells: int = CELLS, strata: int = STRATA, strata_cells: int = STRATA_CELLS):
+        self.cells = cells - cells % HASHES
+        self.strata = strata
+        self.strata_cells = strata_cells - strata_cells % HASHES
+        self.count = [0] * self.cells
+        self.key_sum = [0] * self.cells
+        self.hash_sum = [0] * self.cells
+        size = strata * self.strata_cells
+        self.strata_count = [0] * size
+        self.strata_key = [0] * size
+        self.strata_check = [0] * size
+
+    @classmethod
+    def from_routes(cls, routes: Iterable[Mapping[str, Any]], **params) -> 'TableSketch':
+        """Ескіз таблиці; однакові маршрути враховуються один раз, як у utils.route_diff."""
+        sketch = cls(**params)
+        for element in {route_element(route) for route in routes}:
+            sketch.add(element)
+        return sketch
+
+    def update(self, added: Iterable[Mapping[str, Any]], removed: Iterable[Mapping[str, Any]]) -> None:
+        """
+        Оновлення ескізу за різницею таблиць (utils.route_diff з key=route_element) замість повної
+        перебудови: ескіз лінійний, тож вартість пропорційна кількості змін, а не розміру таблиці.
+        """
+        for route in added:
+            self.add(route_element(route))
+        for route in removed:
+            self.add(route_element(route), -1)
+
+    def add(self, element: int, sign: int = 1) -> None:
+        """Додавання (sign=1) або видалення (sign=-1) елемента."""
+        digest = element_digest(element)
+        check = int.from_bytes(digest[24:32], 'little')
+        part = self.cells // HASHES
+        for number in range(HASHES):
+            cell = number * part + int.from_bytes(digest[number * 4:number * 4 + 4], 'little') % part
+            self.count[cell] += sign
+            self.key_sum[cell] ^= element
+            self.hash_sum[cell] ^= check
+
+        # Страта — кількість молодших нульових бітів хешу: у страту i потрапляє ~1/2^(i+1) елементів;
+        # комірки в межах страти обираються за старшими бітами, не пов'язаними з номером страти
+        token = int.from_bytes(digest[12:20], 'little')
+        stratum = min((token & -token).bit_length() - 1, self.strata - 1) if token else self.strata - 1
+        check = token_check(token)
+        part = self.strata_cells // HASHES
+        base = stratum * self.strata_cells
+        for number in range(HASHES):
+            cell = base + number * part + (token >> (16 + number * 16) & 0xFFFF) % part
+            self.strata_count[cell] += sign
+            self.strata_key[cell] ^= token
+            self.strata_check[cell] ^= check
+
+    def _compatible(self, other: 'TableSketch') -> None:
+        if (self.cells, self.strata, self.strata_cells) != (other.cells, other.strata, other.strata_cells):
+            raise ValueError("Ескізи мають різні параметри")
+
+    def _combine(self, other: 'TableSketch', sign: int) -> 'TableSketch':
+        self._compatible(other)
+        result = TableSketch(self.cells, self.strata, self.strata_cells)
+        result.count = [a + sign * b for a, b in zip(self.count, other.count)]
+        result.key_sum = [a ^ b for a, b in zip(self.key_sum, other.key_sum)]
+        result.hash_sum = [a ^ b for a, b in zip(self.hash_sum, other.hash_sum)]
+        result.strata_count = [a + sign * b for a, b in zip(self.strata_count, other.strata_count)]
+        result.strata_key = [a ^ b for a, b in zip(self.strata_key, other.strata_key)]
+        result.strata_check = [a ^ b for a, b in zip(self.strata_check, other.strata_check)]
+        return result
+
+    def subtract(self, other: 'TableSketch') -> 'TableSketch':
+        """Ескіз різниці self - other: спільні маршрути взаємно знищуються."""
+        return self._combine(other, -1)
+
+    def merge(self, other: 'TableSketch') -> 'TableSketch':
+        """Ескіз об'єднання (мультимножини) двох таблиць."""
+        return self._combine(other, 1)
+
+    def decode(self) -> tuple[bool, set[int], set[int]]:
+        """
+        Відновлення елементів ескізу різниці видаленням «чистих» комірок.
+        Returns:
+            tuple: (успіх, елементи з лічильником +1, елементи з лічильником -1).
+        """
+        count, key_sum, hash_sum = list(self.count), list(self.key_sum), list(self.hash_sum)
+        positive, negative = set(), set()
+        part = self.cells // HASHES
+        pending = list(range(self.cells))
+        while pending:
+            cell = pending.pop()
+            if count[cell] not in (1, -1):
+                continue
+            element, sign = key_sum[cell], count[cell]
+            digest = element_digest(element)
+            check = int.from_bytes(digest[24:32], 'little')
+            if hash_sum[cell] != check:
+                continue
+            (positive if sign > 0 else negative).add(element)
+            for number in range(HASHES):
+                target = number * part + int.from_bytes(digest[number * 4:number * 4 + 4], 'little') % part
+                count[target] -= sign
+                key_sum[target] ^= element
+                hash_sum[target] ^= check
+                pending.append(target)
+        decoded = not any(count) and not any(key_sum) and not any(hash_sum)
+        return decoded, positive, negative
+
+    def _decode_stratum(self, stratum: int) -> int | None:
+        """Кількість елементів страти ескізу різниці або None, якщо страту не декодовано."""
+        base = stratum * self.strata_cells
+        count = self.strata_count[base:base + self.strata_cells]
+        key = self.strata_key[base:base + self.strata_cells]
+        check = self.strata_check[base:base + self.strata_cells]
+        part = self.strata_cells // HASHES
+        found = 0
+        pending = list(range(self.strata_cells))
+        while pending:
+            cell = pending.pop()
+            if count[cell] not in (1, -1) or check[cell] != token_check(key[cell]):
+                continue
+            token, sign = key[cell], count[cell]
+            found += 1
+            for number in range(HASHES):
+                target = number * part + (token >> (16 + number * 16) & 0xFFFF) % part
+                count[target] -= sign
+                key[target] ^= token
+                check[target] ^= token_check(token)
+                pending.append(target)
+        if any(count) or any(key) or any(check):
+            return None
+        return found
+
+    def estimate(self) -> int:
+        """Оцінка кількості елементів ескізу різниці (стратифікований оцінювач)."""
+        found = 0
+        for stratum in range(self.strata - 1, -1, -1):
+            size = self._decode_stratum(stratum)
+            if size is None:
+                if stratum == self.strata - 1:
+                    # Не декодується навіть найменша страта: лише нижня межа за лічильниками
+                    return sum(map(abs, self.strata_count)) // HASHES
+                return found * 2 ** (stratum + 1)
+            found += size
+        return found
+
+    def to_bytes(self) -> bytes:
+        """Компактне двійкове подання (кілька КБ незалежно від розміру таблиці)."""
+        parts = [HEADER.pack(MAGIC, VERSION, self.cells, self.strata, self.strata_cells)]
+        parts += [IBLT_CELL.pack(count, key.to_bytes(ELEMENT_BYTES, 'big'), check)
+                  for count, key, check in zip(self.count, self.key_sum, self.hash_sum)]
+        parts += [STRATA_CELL.pack(count, key, check)
+                  for count, key, check in zip(self.strata_count, self.strata_key, self.strata_check)]
+        return zlib.compress(b''.join(parts))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'TableSketch':
+        data = zlib.decompress(data)
+        magic, version, cells, strata, strata_cells = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Невідомий формат ескізу")
+        sketch = cls(cells, strata, strata_cells)
+        pos = HEADER.size
+        for cell in range(sketch.cells):
+            count, key, check = IBLT_CELL.unpack_from(data, pos)
+            sketch.count[cell], sketch.key_sum[cell], sketch.hash_sum[cell] = count, int.from_bytes(key, 'big'), check
+            pos += IBLT_CELL.size
+        for cell in range(len(sketch.strata_count)):
+            sketch.strata_count[cell], sketch.strata_key[cell], sketch.strata_check[cell] = STRATA_CELL.unpack_from(data, pos)
+            pos += STRATA_CELL.size
+        return sketch
+
+    def to_text(self) -> str:
+        """Подання для поля 'sketch' JSON-знімка."""
+        return base64.b64encode(self.to_bytes()).decode('ascii')
+
+    @classmethod
+    def from_text(cls, text: str) -> 'TableSketch':
+        return cls.from_bytes(base64.b64decode(text))
+
+
+def snapshot_sketch(snapshot: Mapping[str, Any]) -> TableSketch:
+    """Ескіз знімка: зі збереженого поля 'sketch' або побудований з таблиці маршрутів."""
+    if snapshot.get('sketch'):
+        try:
+            return TableSketch.from_text(snapshot['sketch'])
+        except ValueError:
+            pass  # ескіз попереднього формату: перебудова з таблиці маршрутів
+    return TableSketch.from_routes(snapshot.get('routes', []))
+
+
+def compare_sketches(left: TableSketch, right: TableSketch) -> SketchDiff:
+    """
+    Порівняння двох таблиць лише за їхніми ескізами.
+    Args:
+        left: Ескіз попередньої (еталонної, архівної) таблиці.
+        right: Ескіз поточної таблиці.
+    Returns:
+        SketchDiff: Розмір різниці та, якщо її вдалося декодувати, відмінні маршрути.
+    """
+    difference = right.subtract(left)
+    decoded, added, removed = difference.decode()
+    if decoded:
+        return SketchDiff(len(added) + len(removed), True,
+                          [element_route(element) for element in sorted(added)],
+                          [element_route(element) for element in sorted(removed)])
+    return SketchDiff(max(difference.estimate(), len(added) + len(removed)), False, [], [])
+
+
+def benchmark(routes: int = 200000, changes: int = 30) -> None:
+    """Побудова ескізів для великої таблиці та відновлення невеликої різниці."""
+    table = [{'dst-address': f"{10 + (i >> 16 & 0x7F)}.{i >> 8 & 0xFF}.{i & 0xFF}.0/24",
+              'gateway': f"10.0.{i % 4}.1", 'distance': '200'} for i in range(routes)]
+    changed = list(table)
+    for index in random.sample(range(routes), changes):
+        changed[index] = dict(changed[index], gateway='10.0.99.1')
+
+    started = time.perf_counter()
+    left = TableSketch.from_routes(table)
+    elapsed = time.perf_counter() - started
+    right = TableSketch.from_routes(changed)
+    size = len(left.to_bytes())
+
+    started = time.perf_counter()
+    result = compare_sketches(TableSketch.from_bytes(left.to_bytes()), right)
+    compared = time.perf_counter() - started
+    print(f"TableSketch: {routes} маршрутів за {elapsed:.2f} с ({elapsed / routes * 1e6:.2f} мкс/маршрут), "
+          f"розмір {size} байт")
+    print(f"Порівняння: різниця {result.size} (декодовано: {result.decoded}) за {compared * 1000:.1f} мс")
+
+    for index in random.sample(range(routes), 2000):
+        changed[index] = dict(changed[index], distance='20')
+    actual = 2 * sum(1 for old, new in zip(table, changed) if old is not new)
+    estimate = compare_sketches(left, TableSketch.from_routes(changed)).size
+    print(f"Оцінка великої різниці: {estimate} (фактично {actual})")
+
+
+def format_diff(diff: SketchDiff) -> str:
+    """Опис результату порівняння для журналу або консолі."""
+    if not diff.decoded:
+        return f"різниця ~{diff.size} маршрутів (завелика для відновлення за ескізом)"
+    routes = [f"+{route['dst-address']} через {route['gateway'] or '-'} ({route['distance']})" for route in diff.added]
+    routes += [f"-{route['dst-address']} через {route['gateway'] or '-'} ({route['distance']})" for route in diff.removed]
+    return f"різниця {diff.size}" + (": " + ", ".join(routes) if routes else "")
+
+
+def archive_sketches(pattern: str, chunk_path: str = 'data/store') -> Iterable[tuple[str, TableSketch]]:
+    """Пари (час знімка, ескіз) архіву; для знімків зі збереженим ескізом таблиця маршрутів не завантажується."""
+    from src.batch_analytics import iter_snapshots
+    for snapshot in iter_snapshots(pattern, chunk_path):
+        yield str(snapshot.get('timestamp', '')), snapshot_sketch(snapshot)
+
+
+def main() -> None:
+    from config import load_config
+    config = load_config('config/config.yaml')
+    analyze_config = config['analyze']
+
+    parser = argparse.ArgumentParser(description="Порівняння архівних знімків таблиць маршрутів за ескізами")
+    parser.add_argument('archive', nargs='?', help="шаблон шляху до архіву одного маршрутизатора "
+                                                   "(наприклад, 'data/*_Router4_*bgp_data.json*')")
+    parser.add_argument('--against', default='', help="другий архів (інший маршрутизатор або запуск): "
+                                                      "порівнюються останні знімки обох архівів")
+    parser.add_argument('--etalon', default='', help="шаблон шляху до .backup/експорту: кожен знімок порівнюється з еталоном")
+    parser.add_argument('--etalon-router', default=analyze_config.get('etalon-router', ''))
+    parser.add_argument('--benchmark', action='store_true', help="лише виміряти швидкість побудови та порівняння ескізів")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        return
+    if not args.archive:
+        parser.error("не вказано архів історії")
+    chunk_path = config['storage'].get('chunk_path', 'data/store')
+
+    if args.against:
+        # Зберігаються лише ескізи, тож пам'ять не залежить від розміру таблиць і довжини архівів
+        left = right = None
+        for left in archive_sketches(args.archive, chunk_path):
+            pass
+        for right in archive_sketches(args.against, chunk_path):
+            pass
+        if left is None or right is None:
+            parser.error("архів не містить знімків")
+        print(f"{left[0]} -> {right[0]}: {format_diff(compare_sketches(left[1], right[1]))}")
+        return
+
+    reference = None
+    if args.etalon:
+        from src.backup_loader import load_etalons
+        reference = TableSketch.from_routes(load_etalons(args.etalon)[args.etalon_router].get('routes', []))
+    previous = None
+    snapshots = changed = 0
+    for timestamp, sketch in archive_sketches(args.archive, chunk_path):
+        # Без еталона кожен знімок порівнюється з попереднім (історія змін таблиці)
+        left = reference or previous
+        if left is not None:
+            diff = compare_sketches(left, sketch)
+            if diff.size:
+                changed += 1
+                print(f"{timestamp}: {format_diff(diff)}")
+        previous = sketch
+        snapshots += 1
+    if not snapshots:
+        parser.error(f"архів {args.archive} не містить знімків")
+    print(f"Знімків: {snapshots}, з відмінностями: {changed}")
+
+
+if __name__ == '__main__':
+    main()
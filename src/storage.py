@@ -4,13 +4,14 @@ import os
 from datetime import datetime
 
 from config import CHART_TIME_FORMAT
+from src.segment_log import SegmentWriter
 
 
 class DataStorage:
     """Клас для збереження даних."""
-    def __init__(self, output_path):
+    def __init__(self, output_path, label="overall"):
         now = datetime.now()
-        self.output_path = output_path.format(now.strftime("%Y%m%d"), now.strftime("%H%M%S"), "overall")
+        self.output_path = output_path.format(now.strftime("%Y%m%d"), now.strftime("%H%M%S"), label)
         os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
 
     def save_data(self, data):
@@ -24,6 +25,32 @@ class DataStorage:
             raise
 
 
+class CompressedDataStorage:
+    """
+    Клас для збереження даних у стиснені сегменти gzip з ротацією (один JSON-рядок на знімок).
+    Знімки стискаються блоками по block_bytes (або за flush_seconds), щоб gzip використовував
+    повторення між сусідніми знімками; індекс сегмента дозволяє почати читання з потрібного блоку.
+    """
+    def __init__(self, output_path: str, max_bytes: int = 64 * 1024 * 1024, max_seconds: float = 3600.0,
+                 label: str = "overall", block_bytes: int = 4 * 1024 * 1024, flush_seconds: float = 300.0):
+        now = datetime.now()
+        self.output_path = output_path.format(now.strftime("%Y%m%d"), now.strftime("%H%M%S"), label)
+        self.writer = SegmentWriter(self.output_path, max_bytes=max_bytes, max_seconds=max_seconds,
+                                    block_bytes=block_bytes, flush_seconds=flush_seconds)
+
+    def save_data(self, data):
+        """Додавання знімка до поточного блоку сегмента."""
+        try:
+            self.writer.write((json.dumps(data, ensure_ascii=False) + "\n").encode('utf-8'))
+            logging.info(f"Дані збережено у {self.writer.segment_path(self.writer.segment)}")
+        except Exception as e:
+            logging.error(f"Помилка збереження даних: {e}")
+            raise
+
+    def close(self):
+        self.writer.close()
+
+
 class ChartStorage:
     """Клас для збереження даних."""
     def __init__(self, output_path: str):
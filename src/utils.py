@@ -1,4 +1,8 @@
 import re
+import socket
+import time
+from functools import lru_cache
+from collections.abc import Callable, Hashable
 from typing import Any
 
 # RegEx для одного октету IPv4 (0-255)
@@ -90,22 +94,126 @@ def ip_addr_to_int(ip_addr: str) -> int|None:
 
 def net_addr_to_int(net_addr: str) -> int | None:
     """
-    Конвертує IP адресу мережі у ціле число
+    Конвертує IP адресу мережі (IPv4 або IPv6) у ціле число
     :param net_addr: IP адреса мережі
-    :return: повертає цілочисельний хеш
+    :return: повертає ключ префікса prefix_key або None для некоректної адреси
     """
-
-    if not is_valid_ipv4_net(net_addr):
+    try:
+        return prefix_key(net_addr)
+    except ValueError:
         return None
 
-    (address, prefix_len) =  net_addr.split("/")
+# Ключ префікса — ціле число фіксованої ширини (PREFIX_KEY_BYTES байт):
+#   біт сімейства (0 - IPv4, 1 - IPv6) | 128 біт адреси | 8 біт довжини префікса.
+# Упорядкування ключів збігається з упорядкуванням (сімейство, адреса, довжина),
+# тому IPv4 та IPv6 сортуються й хешуються однаково без колізій між довжинами.
+FAMILY_IPV4, FAMILY_IPV6 = 0, 1
+# Ключ маршрутів з некоректною мережею: поза простором ключів, щоб не збігатися з 0.0.0.0/0
+INVALID_PREFIX = -1
+PREFIX_KEY_BYTES = 18
+ADDRESS_BITS = {FAMILY_IPV4: 32, FAMILY_IPV6: 128}
+
+@lru_cache(maxsize=1 << 20)
+def prefix_key(prefix: str) -> int:
+    """
+    Ключ префікса мережі або адреси (без довжини — вузол /32 чи /128).
+    Args:
+        prefix: '192.168.1.0/24', '2001:db8::/32', '10.0.14.1' тощо.
+    Returns:
+        int: Ключ; однакові мережі в різних записах IPv6 мають однаковий ключ.
+    Raises:
+        ValueError: Некоректна адреса або довжина префікса.
+    """
+    address, _, length = prefix.partition('/')
+    try:
+        if ':' in address:
+            family, packed = FAMILY_IPV6, socket.inet_pton(socket.AF_INET6, address.split('%')[0])
+        else:
+            family, packed = FAMILY_IPV4, socket.inet_pton(socket.AF_INET, address)
+    except OSError:
+        raise ValueError(f"Некоректна адреса: {prefix}") from None
+    bits = ADDRESS_BITS[family]
+    length = int(length) if length else bits
+    if not 0 <= length <= bits:
+        raise ValueError(f"Некоректна довжина префікса: {prefix}")
+    return (family << 136) | (int.from_bytes(packed, 'big') << 8) | length
+
+def prefix_family(key: int) -> int:
+    return key >> 136
+
+def prefix_length(key: int) -> int:
+    return key & 0xFF
+
+def prefix_bytes(key: int) -> bytes:
+    """Упакований ключ (PREFIX_KEY_BYTES байт, порівняння байтів збігається з порівнянням ключів)."""
+    return key.to_bytes(PREFIX_KEY_BYTES, 'big')
+
+def prefix_from_bytes(data: bytes) -> int:
+    return int.from_bytes(data, 'big')
+
+def format_prefix(key: int) -> str:
+    """Запис ключа у нотації CIDR."""
+    if key == INVALID_PREFIX:
+        return "некоректний префікс"
+    family, address = key >> 136, (key >> 8) & ((1 << 128) - 1)
+    if family == FAMILY_IPV6:
+        text = socket.inet_ntop(socket.AF_INET6, address.to_bytes(16, 'big'))
+    else:
+        text = socket.inet_ntop(socket.AF_INET, address.to_bytes(4, 'big'))
+    return f"{text}/{key & 0xFF}"
+
+def network_key(key: int) -> int:
+    """Ключ мережі, до якої належить адреса ключа (біти вузла обнуляються)."""
+    bits, length = ADDRESS_BITS[key >> 136], key & 0xFF
+    host_mask = ((1 << (bits - length)) - 1) << 8
+    return key & ~host_mask
+
+def route_prefix_key(route: dict[str, str]) -> int:
+    """Ключ префікса маршруту; некоректна мережа отримує ключ INVALID_PREFIX."""
+    try:
+        return prefix_key(route.get('dst-address', zero_net_addr))
+    except ValueError:
+        return INVALID_PREFIX
+
+def route_sort_key(route: dict[str, str]) -> tuple[int, str]:
+    """
+    Ключ канонічного впорядкування маршрутів (за ключем префікса: сімейство, адреса, довжина; потім шлюз),
+    щоб знімки з різних джерел (опитування, резервна копія) можна було порівнювати послідовно
+    """
+    return route_prefix_key(route), route.get('gateway', zero_ip_addr)
+
+def route_diff(l_routes: list[dict[str, str]], r_routes: list[dict[str, str]],
+               key: Callable[[dict[str, str]], Hashable] | None = None) -> tuple[list[dict[str, str]], list[dict[str, str]]]:
+    """
+    Різниця двох таблиць маршрутів за парою (ключ префікса, шлюз)
+    :param l_routes: попередня таблиця
+    :param r_routes: поточна таблиця
+    :param key: інший ключ ідентичності маршруту, наприклад sketch.route_element (нормалізований шлюз
+        і відстань: зміна відстані — видалення і додавання маршруту)
+    :return: повертає кортеж (додані маршрути, видалені маршрути)
+    """
+    if key is None:
+        key = lambda route: (route_prefix_key(route), route.get('gateway'))
+    l_keys = {key(route): route for route in l_routes}
+    r_keys = {key(route): route for route in r_routes}
+    added = [route for route_key, route in r_keys.items() if route_key not in l_keys]
+    removed = [route for route_key, route in l_keys.items() if route_key not in r_keys]
+    return added, removed
 
-    return (ip_addr_to_int(address) << 5) + int(prefix_len)
+def drop_distance_changes(added: list[dict[str, str]],
+                          removed: list[dict[str, str]]) -> tuple[list[dict[str, str]], list[dict[str, str]]]:
+    """
+    Перетворення результату route_diff(..., key=sketch.route_element) на різницю за парою (ключ префікса, шлюз):
+    маршрути, у яких змінилась лише відстань, виключаються з обох списків
+    """
+    path = lambda route: (route_prefix_key(route), route.get('gateway'))
+    moved = {path(route) for route in added} & {path(route) for route in removed}
+    return [route for route in added if path(route) not in moved], [route for route in removed if path(route) not in moved]
 
 def clear_routes(routes: list[dict[str, str]]) -> list[list[str | int]]:
     return list(
         [
-            route.get("dst-address", zero_net_addr),
+            route_prefix_key(route),
             route.get("gateway", zero_ip_addr),
             route.get("distance", 255)
         ]
@@ -129,4 +237,38 @@ def normalize(origin: (int, int, int), base: int) -> (float, float, float):
     :param base: кількість значень
     :return: повертає нормалізований кортеж
     """
-    return tuple(float(value)/max(base, 1) for value in origin)
\ No newline at end of file
+    return tuple(float(value)/max(base, 1) for value in origin)
+
+def benchmark(routes: int = 200000) -> None:
+    """
+    Вартість ключа на маршрут: попереднє кодування IPv4 (регулярний вираз, << 5) проти
+    prefix_key для таблиць лише IPv4 та змішаних (половина IPv6), з холодним і теплим кешем.
+    """
+    def legacy_key(net_addr: str) -> int | None:
+        if not is_valid_ipv4_net(net_addr):
+            return None
+        address, prefix_len = net_addr.split("/")
+        return (ip_addr_to_int(address) << 5) + int(prefix_len)
+
+    ipv4 = [f"{10 + (i >> 16 & 0x7F)}.{i >> 8 & 0xFF}.{i & 0xFF}.0/24" for i in range(routes)]
+    ipv6 = [f"2001:db8:{i >> 16 & 0xFFFF:x}:{i & 0xFFFF:x}::/64" for i in range(routes // 2)]
+    mixed = ipv4[:routes // 2] + ipv6
+
+    def measure(name: str, function, table: list[str]) -> None:
+        started = time.perf_counter()
+        keys = [function(prefix) for prefix in table]
+        keys.sort()
+        elapsed = time.perf_counter() - started
+        print(f"{name}: {elapsed / len(table) * 1e9:.0f} нс на маршрут (ключ + сортування)")
+
+    measure("IPv4, попередній ключ", legacy_key, ipv4)
+    prefix_key.cache_clear()
+    measure("IPv4, prefix_key, холодний кеш", prefix_key, ipv4)
+    measure("IPv4, prefix_key, теплий кеш", prefix_key, ipv4)
+    prefix_key.cache_clear()
+    measure("IPv4+IPv6, prefix_key, холодний кеш", prefix_key, mixed)
+    measure("IPv4+IPv6, prefix_key, теплий кеш", prefix_key, mixed)
+
+
+if __name__ == '__main__':
+    benchmark()